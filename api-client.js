@@ -9,6 +9,8 @@ const API_BASE_URL = 'http://localhost:8080';
 class ASCAApiClient {
     constructor(baseUrl = API_BASE_URL) {
         this.baseUrl = baseUrl;
+        // endpoint + body -> { etag, data } for conditional refetches
+        this.etagCache = new Map();
     }
 
     async request(endpoint, options = {}) {
@@ -33,6 +35,36 @@ class ASCAApiClient {
         }
     }
 
+    // POST that revalidates with If-None-Match; a 304 reuses the last response
+    async conditionalRequest(endpoint, body) {
+        const cacheKey = `${endpoint}\n${body}`;
+        const cached = this.etagCache.get(cacheKey);
+        const url = `${this.baseUrl}${endpoint}`;
+        const headers = { 'Content-Type': 'application/json' };
+        if (cached) {
+            headers['If-None-Match'] = cached.etag;
+        }
+
+        try {
+            const response = await fetch(url, { method: 'POST', headers, body });
+            if (response.status === 304 && cached) {
+                return cached.data;
+            }
+            if (!response.ok) {
+                throw new Error(`API Error: ${response.status} ${response.statusText}`);
+            }
+            const data = await response.json();
+            const etag = response.headers.get('ETag');
+            if (etag) {
+                this.etagCache.set(cacheKey, { etag, data });
+            }
+            return data;
+        } catch (error) {
+            console.error('API Request failed:', error);
+            throw error;
+        }
+    }
+
     // Health check
     async healthCheck() {
         return this.request('/');
@@ -48,17 +80,22 @@ class ASCAApiClient {
 
     // Analyze workload (multiple assignments)
     async analyzeWorkload(assignments) {
-        return this.request('/api/analyze-workload', {
-            method: 'POST',
-            body: JSON.stringify(assignments)
-        });
+        return this.conditionalRequest('/api/analyze-workload', JSON.stringify(assignments));
     }
 
     // Create schedule (2 agents: Analyzer + Scheduler)
-    async createSchedule(assignments, preferences = null) {
-        return this.request('/api/create-schedule', {
+    async createSchedule(assignments, preferences = null, calendarIcs = null) {
+        return this.conditionalRequest(
+            '/api/create-schedule',
+            JSON.stringify({ assignments, preferences, calendar_ics: calendarIcs })
+        );
+    }
+
+    // Check a schedule for overlaps and calendar conflicts (no LLM call)
+    async validateSchedule(dailySchedules, calendarIcs = null) {
+        return this.request('/api/schedule/validate', {
             method: 'POST',
-            body: JSON.stringify({ assignments, preferences })
+            body: JSON.stringify({ daily_schedules: dailySchedules, calendar_ics: calendarIcs })
         });
     }
 
@@ -72,16 +109,63 @@ class ASCAApiClient {
 
     // Full multi-agent analysis (all 3 agents)
     async fullAnalysis(assignments, preferences = null, wellnessInput = null) {
-        return this.request('/api/full-analysis', {
+        return this.conditionalRequest('/api/full-analysis', JSON.stringify({
+            assignments,
+            preferences,
+            wellness_input: wellnessInput
+        }));
+    }
+
+    // Submit full analysis as a background job (returns job id immediately)
+    async submitFullAnalysisJob(assignments, preferences = null, wellnessInput = null, callbackUrl = null) {
+        return this.request('/api/jobs/full-analysis', {
             method: 'POST',
-            body: JSON.stringify({ 
-                assignments, 
-                preferences, 
-                wellness_input: wellnessInput 
+            body: JSON.stringify({
+                assignments,
+                preferences,
+                wellness_input: wellnessInput,
+                callback_url: callbackUrl
             })
         });
     }
 
+    // Poll job status
+    async getJob(jobId) {
+        return this.request(`/api/jobs/${jobId}`);
+    }
+
+    // Fetch a finished job's result
+    async getJobResult(jobId) {
+        return this.request(`/api/jobs/${jobId}/result`);
+    }
+
+    // Cancel a queued or running job
+    async cancelJob(jobId) {
+        return this.request(`/api/jobs/${jobId}`, { method: 'DELETE' });
+    }
+
+    // Register for study-group matching (availability from the given or latest stored schedule)
+    async registerStudyGroupStudent(studentId, courses, dailySchedules = null, name = null) {
+        return this.request(`/api/study-groups/students/${encodeURIComponent(studentId)}`, {
+            method: 'PUT',
+            body: JSON.stringify({ courses, name, daily_schedules: dailySchedules })
+        });
+    }
+
+    // Top-k study partners by shared courses and free time
+    async getStudyPartners(studentId, k = 5, course = null) {
+        const query = `?k=${k}` + (course ? `&course=${encodeURIComponent(course)}` : '');
+        return this.request(`/api/study-groups/students/${encodeURIComponent(studentId)}/partners${query}`);
+    }
+
+    // Time blocks when every student in a group is free
+    async getCommonStudySlots(studentIds, minMinutes = 60) {
+        return this.request('/api/study-groups/common-slots', {
+            method: 'POST',
+            body: JSON.stringify({ student_ids: studentIds, min_minutes: minMinutes })
+        });
+    }
+
     // Suggest break
     async suggestBreak(currentActivity, timeWorked) {
         return this.request('/api/suggest-break', {
@@ -89,6 +173,25 @@ class ASCAApiClient {
             body: JSON.stringify({ current_activity: currentActivity, time_worked: timeWorked })
         });
     }
+
+    // Open a live study session; onMessage receives break_suggestion and status events
+    openStudySession(studentId, onMessage) {
+        const wsUrl = this.baseUrl.replace(/^http/, 'ws');
+        const query = studentId ? `?student_id=${encodeURIComponent(studentId)}` : '';
+        const socket = new WebSocket(`${wsUrl}/ws/study-session${query}`);
+        socket.onmessage = (event) => onMessage(JSON.parse(event.data));
+        const send = (message) => {
+            if (socket.readyState === WebSocket.OPEN) {
+                socket.send(JSON.stringify(message));
+            }
+        };
+        return {
+            tick: (activity, elapsedMinutes) => send({ type: 'tick', activity, elapsed_minutes: elapsedMinutes }),
+            breakTaken: () => send({ type: 'break' }),
+            end: () => send({ type: 'end' }),
+            socket
+        };
+    }
 }
 
 // Create global API client instance
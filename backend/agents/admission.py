@@ -0,0 +1,131 @@
+"""
+Admission Control
+Sheds LLM work under overload: degrade interactive requests, reject bulk ones
+"""
+
+import contextvars
+import os
+from typing import Any, Dict
+
+from agents.llm_scheduler import PRIORITY_INTERACTIVE
+
+
+ADMIT = "admit"
+DEGRADE = "degrade"
+REJECT = "reject"
+
+# Set for requests admitted in degraded mode; LLM calls made inside fail fast
+current_degraded = contextvars.ContextVar("asca_degraded", default=False)
+
+# Agents that answered from local heuristics during the current request. The
+# middleware installs a fresh set, which gathered agent tasks share and add to
+current_fallbacks = contextvars.ContextVar("asca_fallbacks", default=None)
+
+
+class OverloadedError(Exception):
+    """Raised instead of queueing an LLM call while the request is degraded"""
+
+
+def is_degraded() -> bool:
+    return current_degraded.get()
+
+
+def note_fallback(agent: str):
+    """Record that an agent served a local fallback instead of an LLM answer"""
+    fallbacks = current_fallbacks.get()
+    if fallbacks is not None:
+        fallbacks.add(agent)
+
+
+def served_fallback() -> bool:
+    """Whether any part of the current request's result is a local fallback"""
+    return is_degraded() or bool(current_fallbacks.get())
+
+
+class AdmissionController:
+    """
+    Decides per request whether it may queue on the LLM
+
+    Load is the number of LLM-backed requests in flight plus the LLM
+    scheduler's queue depth. Below `max_in_flight` / `max_queue_depth`
+    everything is admitted. Above either, interactive requests are served in
+    degraded mode (agents skip the LLM and use their local heuristics) while
+    background, bulk and job submissions are rejected with a Retry-After.
+    Past `reject_in_flight` even interactive requests are rejected, bounding
+    memory and event-loop work during a spike. Queued and running jobs are
+    deferred LLM work too: once `max_job_backlog` of them are pending, bulk,
+    background and job submissions are rejected even if live load is low.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 32,
+        max_queue_depth: int = 16,
+        reject_in_flight: int = 128,
+        max_job_backlog: int = 32,
+        retry_after_seconds: int = 30
+    ):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue_depth = max(1, max_queue_depth)
+        self.reject_in_flight = max(self.max_in_flight, reject_in_flight)
+        self.max_job_backlog = max(1, max_job_backlog)
+        self.retry_after_seconds = max(1, retry_after_seconds)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._counts = {ADMIT: 0, DEGRADE: 0, REJECT: 0}
+
+    def decide(self, priority: str, queue_depth: int, bulk: bool = False, job_backlog: int = 0) -> str:
+        """
+        Admission decision for a new request
+
+        Args:
+            priority: The request's LLM priority class
+            queue_depth: Current LLM scheduler queue depth
+            bulk: Whether the request enqueues deferred work (jobs), which is never degraded
+            job_backlog: Jobs currently queued or running
+        """
+        deferrable = bulk or priority != PRIORITY_INTERACTIVE
+        overloaded = self.in_flight >= self.max_in_flight or queue_depth >= self.max_queue_depth
+        if deferrable and job_backlog >= self.max_job_backlog:
+            decision = REJECT
+        elif not overloaded:
+            decision = ADMIT
+        elif deferrable or self.in_flight >= self.reject_in_flight:
+            decision = REJECT
+        else:
+            decision = DEGRADE
+        self._counts[decision] += 1
+        return decision
+
+    def enter(self):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def exit(self):
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = sum(self._counts.values())
+        return {
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "max_in_flight": self.max_in_flight,
+            "max_queue_depth": self.max_queue_depth,
+            "reject_in_flight": self.reject_in_flight,
+            "max_job_backlog": self.max_job_backlog,
+            "retry_after_seconds": self.retry_after_seconds,
+            "admitted": self._counts[ADMIT],
+            "degraded": self._counts[DEGRADE],
+            "rejected": self._counts[REJECT],
+            "shed_rate": round((self._counts[DEGRADE] + self._counts[REJECT]) / total, 3) if total else 0.0,
+        }
+
+
+# Shared controller used by the API middleware
+admission_controller = AdmissionController(
+    max_in_flight=int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 32)),
+    max_queue_depth=int(os.getenv("ADMISSION_MAX_QUEUE_DEPTH", 16)),
+    reject_in_flight=int(os.getenv("ADMISSION_REJECT_IN_FLIGHT", 128)),
+    max_job_backlog=int(os.getenv("ADMISSION_MAX_JOB_BACKLOG", 32)),
+    retry_after_seconds=int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", 30)),
+)
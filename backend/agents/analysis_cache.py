@@ -0,0 +1,164 @@
+"""
+Similarity Analysis Cache
+Reuses assignment analyses across near-duplicate assignments (MinHash + LSH)
+"""
+
+import hashlib
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from agents.records import AssignmentAnalysis
+
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# Filler words that vary between copies of the same assignment
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "on", "in", "to", "for", "from",
+    "with", "by", "at", "is", "are", "be", "your", "you", "please", "this",
+}
+
+
+def _stable_hash(token: str) -> int:
+    """32-bit hash that is identical across processes (unlike hash())"""
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), "big")
+
+
+def normalize_text(text: str) -> List[str]:
+    """Lowercase and tokenize, dropping punctuation, layout and filler words"""
+    return [w for w in _WORD_RE.findall((text or "").lower()) if w not in _STOPWORDS]
+
+
+def shingles(tokens: List[str]) -> Set[str]:
+    """Word unigrams plus bigrams, so short titles still produce signal"""
+    grams = set(tokens)
+    grams.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return grams
+
+
+class SimilarityCache:
+    """
+    Near-duplicate cache keyed by MinHash signatures of title + description
+
+    Entries are scoped to a course. Candidates are found through LSH band
+    buckets, then confirmed with the estimated Jaccard similarity.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.7,
+        num_perm: int = 128,
+        bands: int = 32,
+        max_entries: int = 5000
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        # Fixed permutation coefficients so signatures are reproducible
+        self._perms = [
+            (
+                _stable_hash(f"a{i}") % (_MERSENNE_PRIME - 1) + 1,
+                _stable_hash(f"b{i}") % _MERSENNE_PRIME
+            )
+            for i in range(num_perm)
+        ]
+        self._entries: "OrderedDict[int, Tuple[str, Tuple[int, ...], AssignmentAnalysis]]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, int, Tuple[int, ...]], Set[int]] = {}
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    def signature(self, assignment: Dict[str, Any]) -> Tuple[int, ...]:
+        """MinHash signature of the assignment's normalized title + description"""
+        tokens = normalize_text(f"{assignment.get('title', '')} {assignment.get('description', '')}")
+        hashed = [_stable_hash(s) for s in shingles(tokens)] or [0]
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashed)
+            for a, b in self._perms
+        )
+
+    @staticmethod
+    def _course_key(assignment: Dict[str, Any]) -> str:
+        return " ".join(normalize_text(assignment.get('course', '')))
+
+    def _band_keys(self, course: str, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield (course, band, signature[band * self.rows:(band + 1) * self.rows])
+
+    def lookup(self, assignment: Dict[str, Any]) -> Optional[Tuple[AssignmentAnalysis, float]]:
+        """
+        Find a cached analysis for a near-duplicate assignment in the same course
+
+        Args:
+            assignment: Dict with title, description, course
+
+        Returns:
+            (cached analysis copy, estimated similarity), or None on a miss
+        """
+        course = self._course_key(assignment)
+        signature = self.signature(assignment)
+
+        candidates: Set[int] = set()
+        for key in self._band_keys(course, signature):
+            candidates.update(self._buckets.get(key, ()))
+
+        best_id, best_score = None, 0.0
+        for entry_id in candidates:
+            other = self._entries[entry_id][1]
+            score = sum(x == y for x, y in zip(signature, other)) / self.num_perm
+            if score > best_score:
+                best_id, best_score = entry_id, score
+
+        if best_id is None or best_score < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(best_id)
+        return self._entries[best_id][2].copy(), best_score
+
+    def store(self, assignment: Dict[str, Any], analysis: AssignmentAnalysis):
+        """
+        Remember an analysis so near-duplicates can reuse it
+
+        Args:
+            assignment: The assignment that was analyzed
+            analysis: The LLM analysis for it
+        """
+        course = self._course_key(assignment)
+        signature = self.signature(assignment)
+        entry_id = self._next_id
+        self._next_id += 1
+
+        self._entries[entry_id] = (course, signature, analysis.copy())
+        for key in self._band_keys(course, signature):
+            self._buckets.setdefault(key, set()).add(entry_id)
+
+        while len(self._entries) > self.max_entries:
+            self._evict()
+
+    def _evict(self):
+        entry_id, (course, signature, _) = self._entries.popitem(last=False)
+        for key in self._band_keys(course, signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count and hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "threshold": self.threshold,
+        }
@@ -6,7 +6,38 @@ Analyzes student assignments, deadlines, and workload complexity
 import google.generativeai as genai
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
-import json
+import math
+import os
+
+from agents.model_router import (
+    model_router, extract_json, InvalidModelOutput,
+    TASK_ASSIGNMENT_ANALYSIS, TASK_WORKLOAD_RECOMMENDATIONS
+)
+from agents.admission import note_fallback
+from agents.profiler import profiled
+from agents.analysis_cache import SimilarityCache
+from agents.course_catalog import CourseCatalog, parse_hour_window
+from agents.records import AssignmentAnalysis
+from agents.prompt_memo import QuantizedMemo, parse_bins
+
+
+def _parse_analysis(text: str) -> AssignmentAnalysis:
+    data = extract_json(text)
+    if not isinstance(data, dict):
+        raise InvalidModelOutput("analysis is not a JSON object")
+    analysis = AssignmentAnalysis.from_llm(data)
+    if analysis.complexity_score is None or not 1 <= analysis.complexity_score <= 10:
+        raise InvalidModelOutput("complexity_score missing or outside 1-10")
+    if analysis.estimated_hours is None or analysis.estimated_hours <= 0:
+        raise InvalidModelOutput("estimated_hours missing or not positive")
+    return analysis
+
+
+def _parse_recommendations(text: str) -> List[str]:
+    data = extract_json(text)
+    if not isinstance(data, list) or not data or not all(isinstance(r, str) and r.strip() for r in data):
+        raise InvalidModelOutput("recommendations must be a non-empty list of strings")
+    return data
 
 
 class AssignmentAnalyzerAgent:
@@ -14,10 +45,23 @@ class AssignmentAnalyzerAgent:
     
     def __init__(self, api_key: str):
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
         self.name = "Assignment Analyzer"
+        self.similarity_cache = SimilarityCache(
+            threshold=float(os.getenv("SIMILARITY_CACHE_THRESHOLD", 0.7)),
+            max_entries=int(os.getenv("SIMILARITY_CACHE_SIZE", 5000))
+        )
+        self.catalog = CourseCatalog(
+            budget_per_hour=int(os.getenv("CATALOG_LLM_BUDGET_PER_HOUR", 120)),
+            offpeak_hours=parse_hour_window(os.getenv("CATALOG_OFFPEAK_HOURS", ""))
+        )
+        self.recommendation_memo = QuantizedMemo(
+            bins=parse_bins(os.getenv("PROMPT_MEMO_BINS", "")),
+            ttl_seconds=float(os.getenv("PROMPT_MEMO_TTL_SECONDS", 3600)),
+            max_entries=int(os.getenv("PROMPT_MEMO_SIZE", 1000))
+        )
         
-    async def analyze_assignment(self, assignment: Dict[str, Any]) -> Dict[str, Any]:
+    @profiled("agent.assignment_analyzer.analyze_assignment")
+    async def analyze_assignment(self, assignment: Dict[str, Any]) -> AssignmentAnalysis:
         """
         Analyze a single assignment for complexity, time requirements, and priority
         
@@ -27,6 +71,42 @@ class AssignmentAnalyzerAgent:
         Returns:
             Analysis with complexity score, estimated hours, priority level
         """
+        precomputed = self.catalog.resolve(assignment)
+        if precomputed is not None:
+            analysis = self._refresh_date_fields(precomputed, assignment)
+            analysis.assignment_id = assignment.get('id', 'unknown')
+            analysis.source = "catalog"
+            return analysis
+        
+        cached = self.similarity_cache.lookup(assignment)
+        if cached is not None:
+            analysis, similarity = cached
+            reused_from = analysis.assignment_id
+            analysis = self._refresh_date_fields(analysis, assignment)
+            analysis.assignment_id = assignment.get('id', 'unknown')
+            analysis.analyzed_at = datetime.now().isoformat()
+            analysis.reused_from = {"assignment_id": reused_from, "similarity": round(similarity, 2)}
+            return analysis
+        
+        try:
+            return await self._request_analysis(assignment)
+        except Exception as e:
+            print(f"Error analyzing assignment: {e}")
+            note_fallback(self.name)
+            # Return default analysis
+            return AssignmentAnalysis(
+                assignment_id=assignment.get('id', 'unknown'),
+                complexity_score=5,
+                estimated_hours=3,
+                priority_level="Medium",
+                key_tasks=["Review requirements", "Complete work", "Submit"],
+                recommended_start_date=(datetime.now() + timedelta(days=1)).isoformat(),
+                reasoning="Default analysis due to processing error",
+                analyzed_at=datetime.now().isoformat()
+            )
+    
+    async def _request_analysis(self, assignment: Dict[str, Any]) -> AssignmentAnalysis:
+        """Ask the LLM for an analysis; raises on any failure"""
         prompt = f"""
 You are an expert academic advisor analyzing student assignments.
 
@@ -54,35 +134,48 @@ Respond in JSON format:
 }}
 """
         
-        try:
-            response = self.model.generate_content(prompt)
-            # Extract JSON from response
-            text = response.text.strip()
-            if text.startswith('```json'):
-                text = text[7:]
-            if text.endswith('```'):
-                text = text[:-3]
-            
-            analysis = json.loads(text.strip())
-            analysis['assignment_id'] = assignment.get('id', 'unknown')
-            analysis['analyzed_at'] = datetime.now().isoformat()
+        analysis = await model_router.generate(TASK_ASSIGNMENT_ANALYSIS, prompt, _parse_analysis, agent=self.name)
+        analysis.assignment_id = assignment.get('id', 'unknown')
+        analysis.analyzed_at = datetime.now().isoformat()
+        self.similarity_cache.store(assignment, analysis)
+        
+        return analysis
+    
+    def _refresh_date_fields(self, analysis: AssignmentAnalysis, assignment: Dict[str, Any]) -> AssignmentAnalysis:
+        """
+        Recompute the due-date dependent fields of a reused analysis locally
+        
+        Args:
+            analysis: Analysis borrowed from a similar assignment
+            assignment: The assignment it is being applied to
             
+        Returns:
+            The analysis with priority_level and recommended_start_date updated
+        """
+        try:
+            due = datetime.fromisoformat(str(assignment.get('due_date', ''))[:10])
+        except ValueError:
             return analysis
-            
-        except Exception as e:
-            print(f"Error analyzing assignment: {e}")
-            # Return default analysis
-            return {
-                "assignment_id": assignment.get('id', 'unknown'),
-                "complexity_score": 5,
-                "estimated_hours": 3,
-                "priority_level": "Medium",
-                "key_tasks": ["Review requirements", "Complete work", "Submit"],
-                "recommended_start_date": (datetime.now() + timedelta(days=1)).isoformat(),
-                "reasoning": "Default analysis due to processing error",
-                "analyzed_at": datetime.now().isoformat()
-            }
+        
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        hours = float(analysis.estimated_hours or 3)
+        # Roughly two focused hours per day on one assignment, plus a buffer day
+        lead_days = math.ceil(hours / 2) + 1
+        start = max(today, due - timedelta(days=lead_days))
+        slack = (due - today).days - lead_days
+        
+        if slack <= 1 or (slack <= 3 and (analysis.complexity_score or 5) >= 8):
+            priority = "High"
+        elif slack <= 7:
+            priority = "Medium"
+        else:
+            priority = "Low"
+        
+        analysis.priority_level = priority
+        analysis.recommended_start_date = start.strftime("%Y-%m-%d")
+        return analysis
     
+    @profiled("agent.assignment_analyzer.analyze_workload")
     async def analyze_workload(self, assignments: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Analyze overall workload across multiple assignments
@@ -108,9 +201,9 @@ Respond in JSON format:
             analyses.append(analysis)
         
         # Calculate aggregate metrics
-        total_hours = sum(a.get('estimated_hours', 0) for a in analyses)
-        high_priority_count = sum(1 for a in analyses if a.get('priority_level') == 'High')
-        avg_complexity = sum(a.get('complexity_score', 0) for a in analyses) / len(analyses)
+        total_hours = sum(a.estimated_hours or 0 for a in analyses)
+        high_priority_count = sum(1 for a in analyses if a.priority_level == 'High')
+        avg_complexity = sum(a.complexity_score or 0 for a in analyses) / len(analyses)
         
         # Determine stress level
         if total_hours > 40 or high_priority_count > 3:
@@ -120,12 +213,54 @@ Respond in JSON format:
         else:
             stress_level = "Low"
         
-        # Generate recommendations
+        # Generate recommendations, shared by every student whose aggregates fall in the same bins
+        memo = self.recommendation_memo
+        memo_key = memo.key(
+            assignments=len(assignments),
+            total_hours=total_hours,
+            high_priority=high_priority_count,
+            complexity=round(avg_complexity, 1),
+            stress_level=stress_level
+        )
+        recommendations = memo.get(memo_key)
+        if recommendations is not None:
+            recommendations = list(recommendations)
+        else:
+            recommendations = await self._generate_recommendations(
+                memo.describe('assignments', len(assignments)),
+                memo.describe('total_hours', total_hours),
+                memo.describe('high_priority', high_priority_count),
+                memo.describe('complexity', round(avg_complexity, 1)),
+                stress_level,
+                memo_key
+            )
+        
+        return {
+            "total_assignments": len(assignments),
+            "total_estimated_hours": total_hours,
+            "high_priority_count": high_priority_count,
+            "average_complexity": round(avg_complexity, 1),
+            "stress_level": stress_level,
+            "recommendations": recommendations,
+            "individual_analyses": analyses,
+            "analyzed_at": datetime.now().isoformat()
+        }
+    
+    async def _generate_recommendations(
+        self,
+        assignment_count: str,
+        total_hours: str,
+        high_priority_count: str,
+        avg_complexity: str,
+        stress_level: str,
+        memo_key: tuple
+    ) -> List[str]:
+        """Ask the LLM for workload recommendations; only LLM output is memoized"""
         prompt = f"""
-You are an academic advisor. A student has {len(assignments)} assignments with:
+You are an academic advisor. A student has {assignment_count} assignments with:
 - Total estimated hours: {total_hours}
 - High priority assignments: {high_priority_count}
-- Average complexity: {avg_complexity:.1f}/10
+- Average complexity: {avg_complexity}/10
 - Stress level: {stress_level}
 
 Provide 3-5 specific, actionable recommendations to help them manage their workload effectively.
@@ -133,31 +268,36 @@ Return as a JSON array of strings: ["recommendation1", "recommendation2", ...]
 """
         
         try:
-            response = self.model.generate_content(prompt)
-            text = response.text.strip()
-            if text.startswith('```json'):
-                text = text[7:]
-            if text.endswith('```'):
-                text = text[:-3]
-            recommendations = json.loads(text.strip())
+            recommendations = await model_router.generate(
+                TASK_WORKLOAD_RECOMMENDATIONS, prompt, _parse_recommendations, agent=self.name
+            )
         except:
-            recommendations = [
+            note_fallback(self.name)
+            return [
                 "Start with high-priority assignments first",
                 "Break large assignments into smaller tasks",
                 "Schedule regular study sessions"
             ]
         
-        return {
-            "total_assignments": len(assignments),
-            "total_estimated_hours": total_hours,
-            "high_priority_count": high_priority_count,
-            "average_complexity": round(avg_complexity, 1),
-            "stress_level": stress_level,
-            "recommendations": recommendations,
-            "individual_analyses": analyses,
-            "analyzed_at": datetime.now().isoformat()
-        }
+        self.recommendation_memo.put(memo_key, list(recommendations))
+        return recommendations
+    
+    def register_course_catalog(self, course: str, assignments: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Register a course's published assignments for background pre-analysis
+        
+        Args:
+            course: Course name
+            assignments: List of assignment dicts
+            
+        Returns:
+            Catalog status for the course
+        """
+        status = self.catalog.register(course, assignments)
+        self.catalog.ensure_worker(self._request_analysis)
+        return status
     
+    @profiled("agent.assignment_analyzer.communicate_with_scheduler")
     async def communicate_with_scheduler(self, workload_analysis: Dict[str, Any]) -> Dict[str, Any]:
         """
         Prepare data to send to the Schedule Optimizer Agent
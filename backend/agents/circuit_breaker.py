@@ -0,0 +1,147 @@
+"""
+Circuit Breaker
+Short-circuits LLM calls to local fallbacks while a model is failing
+"""
+
+import time
+from collections import deque
+from typing import Any, Dict, Tuple
+
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a model whose breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker for one model
+
+    Closed: calls flow, outcomes go into a sliding window. Once the window has
+    `min_calls` outcomes and the failure rate reaches `failure_threshold`, the
+    breaker opens and rejects calls for `open_seconds`. After that it is
+    half-open: one probe call at a time is let through; a success closes the
+    breaker, a failure re-opens it.
+
+    Every state change starts a new generation. `before_call` hands out a
+    (generation, is_probe) ticket; outcomes and releases carrying a ticket
+    from an earlier generation are ignored, so calls that started before the
+    breaker opened cannot decide the half-open probe.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 30.0
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.state = STATE_CLOSED
+        self._outcomes = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._generation = 0
+        self.rejected = 0
+        self.times_opened = 0
+        self.last_error = None
+
+    def before_call(self) -> Tuple[int, bool]:
+        """
+        Admit a call, or raise CircuitOpenError if it must not reach the model
+
+        Returns:
+            Ticket to pass to record_success/record_failure/release
+        """
+        if self.state == STATE_OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit open for {self.name}")
+            self.state = STATE_HALF_OPEN
+
+        if self.state == STATE_HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit half-open for {self.name}, probe in flight")
+            self._probe_in_flight = True
+            return self._generation, True
+        return self._generation, False
+
+    def _current(self, ticket: Tuple[int, bool]) -> bool:
+        """Whether a call's ticket belongs to the current generation; clears its probe slot"""
+        generation, probe = ticket
+        if generation != self._generation:
+            return False
+        if probe:
+            self._probe_in_flight = False
+        return True
+
+    def record_success(self, ticket: Tuple[int, bool]):
+        if not self._current(ticket):
+            return
+        if self.state == STATE_HALF_OPEN:
+            self.state = STATE_CLOSED
+            self._generation += 1
+            self._outcomes.clear()
+        self._outcomes.append(True)
+
+    def record_failure(self, ticket: Tuple[int, bool], error: Exception):
+        self.last_error = str(error)[:200]
+        if not self._current(ticket):
+            return
+        if self.state == STATE_HALF_OPEN:
+            self._open()
+            return
+        self._outcomes.append(False)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_threshold:
+            self._open()
+
+    def release(self, ticket: Tuple[int, bool]):
+        """Free the half-open probe slot if this call held it"""
+        self._current(ticket)
+
+    def _open(self):
+        self.state = STATE_OPEN
+        self._generation += 1
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+
+    def status(self) -> Dict[str, Any]:
+        failures = self._outcomes.count(False)
+        status = {
+            "state": self.state,
+            "window_calls": len(self._outcomes),
+            "window_failure_rate": round(failures / len(self._outcomes), 2) if self._outcomes else 0.0,
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected,
+            "last_error": self.last_error,
+        }
+        if self.state == STATE_OPEN:
+            status["retry_in_seconds"] = round(max(0.0, self._opened_at + self.open_seconds - time.monotonic()), 1)
+        return status
+
+
+class CircuitBreakerRegistry:
+    """One breaker per model name, created on first use with shared settings"""
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = self._breakers[name] = CircuitBreaker(name, **self.settings)
+        return breaker
+
+    def status(self) -> Dict[str, Any]:
+        return {name: breaker.status() for name, breaker in self._breakers.items()}
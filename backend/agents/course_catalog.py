@@ -0,0 +1,241 @@
+"""
+Course Catalog
+Pre-analyzes instructor-published assignments off the request path
+"""
+
+import asyncio
+import contextvars
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from agents.analysis_cache import normalize_text
+from agents.llm_scheduler import llm_request_context, llm_scheduler, PRIORITY_BULK
+from agents.records import AssignmentAnalysis
+
+
+AnalyzeFn = Callable[[Dict[str, Any]], Awaitable[AssignmentAnalysis]]
+
+
+def _key(text: str) -> str:
+    return " ".join(normalize_text(text))
+
+
+class CourseCatalog:
+    """
+    Registry of course assignments with precomputed analyses
+
+    A single background worker drains pending items at bulk priority, only
+    while no interactive LLM calls are waiting, within an hourly call budget
+    and (optionally) an off-peak hour window.
+    """
+
+    def __init__(
+        self,
+        budget_per_hour: int = 120,
+        offpeak_hours: Optional[Tuple[int, int]] = None,
+        max_attempts: int = 3
+    ):
+        self.budget_per_hour = budget_per_hour
+        self.offpeak_hours = offpeak_hours
+        self.max_attempts = max_attempts
+        # course key -> item key -> entry
+        self._courses: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # course key -> normalized title -> item key
+        self._titles: Dict[str, Dict[str, str]] = {}
+        self._pending: Deque[Tuple[str, str]] = deque()
+        self._calls: Deque[float] = deque()
+        self._worker: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def register(self, course: str, assignments: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Register (or update) a course's assignment list for pre-analysis
+
+        Items whose title and description are unchanged keep their analysis.
+
+        Args:
+            course: Course name as students will send it
+            assignments: Assignment dicts (id, title, description, due_date)
+
+        Returns:
+            Status summary for the course
+        """
+        course_key = _key(course)
+        items = self._courses.setdefault(course_key, {})
+        titles = self._titles.setdefault(course_key, {})
+
+        for assignment in assignments:
+            assignment = dict(assignment, course=course)
+            item_key = str(assignment.get('id', '')) or _key(assignment.get('title', ''))
+            existing = items.get(item_key)
+            unchanged = (
+                existing is not None
+                and existing['assignment'].get('title') == assignment.get('title')
+                and existing['assignment'].get('description') == assignment.get('description')
+            )
+            if unchanged and existing['state'] != "failed":
+                existing['assignment'] = assignment
+                continue
+            if existing is not None:
+                self._forget_title(course_key, item_key, existing['assignment'].get('title', ''))
+
+            items[item_key] = {
+                "assignment": assignment,
+                "state": "pending",
+                "analysis": None,
+                "attempts": 0,
+                "error": None,
+                "registered_at": datetime.now().isoformat(),
+            }
+            titles[_key(assignment.get('title', ''))] = item_key
+            self._pending.append((course_key, item_key))
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return self.status(course)
+
+    def _forget_title(self, course_key: str, item_key: str, title: str):
+        """Drop a title lookup if it still points at this item"""
+        titles = self._titles.get(course_key, {})
+        title_key = _key(title)
+        if titles.get(title_key) == item_key:
+            del titles[title_key]
+
+    def resolve(self, assignment: Dict[str, Any]) -> Optional[AssignmentAnalysis]:
+        """
+        Look up a precomputed analysis by course and assignment id (or title)
+
+        Args:
+            assignment: Assignment as submitted by a student
+
+        Returns:
+            Copy of the stored analysis, or None if not precomputed
+        """
+        course_key = _key(assignment.get('course', ''))
+        items = self._courses.get(course_key)
+        if not items:
+            return None
+        title = _key(assignment.get('title', ''))
+        entry = items.get(str(assignment.get('id', '')))
+        if entry is None or _key(entry['assignment'].get('title', '')) != title:
+            # Student-side ids need not match the instructor's; fall back to title
+            item_key = self._titles[course_key].get(title)
+            entry = items.get(item_key) if item_key else None
+            if entry is not None and _key(entry['assignment'].get('title', '')) != title:
+                entry = None
+        if entry is None or entry['state'] != "analyzed":
+            return None
+        return entry['analysis'].copy()
+
+    def status(self, course: str = None) -> Dict[str, Any]:
+        """
+        Per-course item states, or a summary of all courses
+
+        Args:
+            course: Optional course name
+
+        Returns:
+            Dict of counts (and items when a course is given)
+        """
+        if course is None:
+            return {
+                "courses": {key: self._counts(items) for key, items in self._courses.items()},
+                "pending": len(self._pending),
+                "calls_last_hour": self._calls_last_hour(),
+                "budget_per_hour": self.budget_per_hour,
+            }
+
+        items = self._courses.get(_key(course), {})
+        return {
+            "course": course,
+            "counts": self._counts(items),
+            "items": [
+                {
+                    "id": key,
+                    "title": entry['assignment'].get('title'),
+                    "state": entry['state'],
+                    "attempts": entry['attempts'],
+                    "error": entry['error'],
+                }
+                for key, entry in items.items()
+            ],
+        }
+
+    @staticmethod
+    def _counts(items: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+        counts = {"pending": 0, "analyzed": 0, "failed": 0}
+        for entry in items.values():
+            counts[entry['state']] += 1
+        return counts
+
+    def _calls_last_hour(self) -> int:
+        cutoff = time.monotonic() - 3600
+        while self._calls and self._calls[0] < cutoff:
+            self._calls.popleft()
+        return len(self._calls)
+
+    def _in_offpeak_window(self) -> bool:
+        if not self.offpeak_hours:
+            return True
+        start, end = self.offpeak_hours
+        hour = datetime.now().hour
+        return start <= hour < end if start <= end else hour >= start or hour < end
+
+    def ensure_worker(self, analyze: AnalyzeFn):
+        """Start the background worker on the running event loop if needed"""
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            # A fresh context, so the worker never inherits the registering request's
+            # student, degraded flag or profile; each call sets bulk priority itself
+            self._worker = asyncio.get_running_loop().create_task(
+                self._run(analyze), context=contextvars.Context()
+            )
+
+    async def _run(self, analyze: AnalyzeFn):
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # Only spend quota off-peak, within budget, and when no student waits on the LLM
+            if not self._in_offpeak_window():
+                await asyncio.sleep(300)
+                continue
+            if self._calls_last_hour() >= self.budget_per_hour:
+                await asyncio.sleep(max(1.0, self._calls[0] + 3600 - time.monotonic()))
+                continue
+            if llm_scheduler.stats()['classes']['interactive']['queued']:
+                await asyncio.sleep(1)
+                continue
+
+            course_key, item_key = self._pending.popleft()
+            entry = self._courses.get(course_key, {}).get(item_key)
+            if entry is None or entry['state'] != "pending":
+                continue
+
+            self._calls.append(time.monotonic())
+            entry['attempts'] += 1
+            try:
+                with llm_request_context(PRIORITY_BULK, f"catalog:{course_key}"):
+                    entry['analysis'] = await analyze(entry['assignment'])
+                entry['state'] = "analyzed"
+                entry['error'] = None
+            except Exception as e:
+                print(f"Error pre-analyzing catalog item {item_key}: {e}")
+                entry['error'] = str(e)
+                if entry['attempts'] >= self.max_attempts:
+                    entry['state'] = "failed"
+                else:
+                    self._pending.append((course_key, item_key))
+
+
+def parse_hour_window(raw: str) -> Optional[Tuple[int, int]]:
+    """Parse "22-6" into (22, 6); empty or malformed means no window"""
+    try:
+        start, end = (int(part) for part in raw.split('-'))
+        return start % 24, end % 24
+    except (AttributeError, ValueError):
+        return None
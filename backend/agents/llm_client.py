@@ -0,0 +1,195 @@
+"""
+LLM Client
+Single entry point for agent Gemini calls: token budgets, circuit breaking, scheduling, record/replay
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Tuple
+
+from agents.llm_scheduler import llm_scheduler, current_tenant, current_student
+from agents.admission import OverloadedError, is_degraded
+from agents.circuit_breaker import CircuitBreakerRegistry
+from agents.token_budget import TokenLedger, parse_budgets
+
+
+MODE_LIVE = "live"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+
+class RecordedResponse:
+    """Stand-in for a Gemini response served from a recording"""
+
+    def __init__(self, text: str, usage: Dict[str, int] = None):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(**(usage or {}))
+
+
+def _usage_dict(response: Any) -> Dict[str, int]:
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return {}
+    return {
+        name: getattr(usage, name, 0) or 0
+        for name in ("prompt_token_count", "candidates_token_count", "total_token_count")
+    }
+
+
+def _token_counts(response: Any, prompt: str) -> Tuple[int, int]:
+    """(prompt, completion) tokens; estimated at ~4 chars/token when the response has no usage"""
+    usage = _usage_dict(response)
+    if usage.get('total_token_count'):
+        return usage['prompt_token_count'], usage['candidates_token_count']
+    return len(prompt) // 4 + 1, len(getattr(response, 'text', '') or '') // 4 + 1
+
+
+class LLMClient:
+    """
+    Routes agent prompts to Gemini through the tenant's token budget, a
+    per-model circuit breaker and the shared scheduler
+
+    In `record` mode every prompt/response pair is appended to a JSONL file
+    keyed by a hash of model + prompt. In `replay` mode responses are served
+    from that file without touching the network, optionally sleeping for the
+    recorded (or a fixed) latency; unknown prompts raise LookupError so agents
+    take their usual fallback path.
+    """
+
+    def __init__(
+        self,
+        mode: str = MODE_LIVE,
+        recordings_path: str = "llm_recordings.jsonl",
+        replay_latency: str = "0",
+        breakers: CircuitBreakerRegistry = None,
+        ledger: TokenLedger = None
+    ):
+        self.mode = mode if mode in (MODE_LIVE, MODE_RECORD, MODE_REPLAY) else MODE_LIVE
+        self.recordings_path = recordings_path
+        self.replay_latency = replay_latency
+        self.breakers = breakers or CircuitBreakerRegistry()
+        self.ledger = ledger or TokenLedger()
+        self._recordings: Dict[str, Dict[str, Any]] = {}
+        if self.mode in (MODE_RECORD, MODE_REPLAY):
+            self._load_recordings()
+
+    @staticmethod
+    def prompt_key(model_name: str, prompt: str) -> str:
+        return hashlib.sha256(f"{model_name}\n{prompt}".encode()).hexdigest()
+
+    def _load_recordings(self):
+        if not os.path.exists(self.recordings_path):
+            return
+        with open(self.recordings_path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._recordings[entry['key']] = entry
+
+    def _append_recording(self, entry: Dict[str, Any]):
+        self._recordings[entry['key']] = entry
+        with open(self.recordings_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    async def generate(self, model: Any, prompt: str, agent: str = "unknown") -> Any:
+        """
+        Generate content for a prompt
+
+        Args:
+            model: genai.GenerativeModel the agent would call
+            prompt: Prompt text
+            agent: Calling agent's name, for token usage attribution
+
+        Returns:
+            Response object exposing `.text` (and `.usage_metadata`)
+
+        Raises:
+            TokenBudgetExceededError: The tenant's token budget is spent; callers fall back locally
+            CircuitOpenError: The model's breaker is open; callers fall back locally
+            OverloadedError: The request was admitted in degraded mode; callers fall back locally
+        """
+        if is_degraded():
+            raise OverloadedError("Server overloaded; serving local heuristics")
+        model_name = getattr(model, 'model_name', 'unknown')
+        key = self.prompt_key(model_name, prompt)
+
+        if self.mode == MODE_REPLAY:
+            entry = self._recordings.get(key)
+            if entry is None:
+                raise LookupError(f"No recorded response for prompt {key[:12]}")
+            delay = entry.get('latency_seconds', 0) if self.replay_latency == "recorded" else float(self.replay_latency or 0)
+            if delay:
+                await asyncio.sleep(delay)
+            return RecordedResponse(entry['text'], entry.get('usage'))
+
+        # Fail fast for tenants over budget or while the model is known to be down, before queueing
+        tenant = current_tenant.get()
+        self.ledger.check(tenant)
+        breaker = self.breakers.get(model_name)
+        ticket = breaker.before_call()
+        started = time.monotonic()
+        try:
+            response = await llm_scheduler.submit(model.generate_content, prompt)
+        except Exception as e:
+            breaker.record_failure(ticket, e)
+            raise
+        finally:
+            breaker.release(ticket)
+        breaker.record_success(ticket)
+        prompt_tokens, completion_tokens = _token_counts(response, prompt)
+        self.ledger.record(tenant, agent, model_name, prompt_tokens, completion_tokens, current_student.get())
+
+        if self.mode == MODE_RECORD:
+            self._append_recording({
+                "key": key,
+                "model": model_name,
+                "prompt": prompt,
+                "text": response.text,
+                "usage": _usage_dict(response),
+                "latency_seconds": round(time.monotonic() - started, 3),
+            })
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        """Current mode and number of recordings loaded"""
+        return {
+            "mode": self.mode,
+            "recordings": len(self._recordings),
+            "recordings_path": self.recordings_path,
+        }
+
+    def breaker_status(self) -> Dict[str, Any]:
+        """Circuit breaker state per model"""
+        return self.breakers.status()
+
+    def usage(self) -> Dict[str, Any]:
+        """Token usage and budget state per tenant"""
+        return self.ledger.stats()
+
+
+# Shared client used by all agents
+llm_client = LLMClient(
+    mode=os.getenv("LLM_MODE", MODE_LIVE).lower(),
+    recordings_path=os.getenv("LLM_RECORDINGS_PATH", "llm_recordings.jsonl"),
+    replay_latency=os.getenv("LLM_REPLAY_LATENCY", "0"),
+    breakers=CircuitBreakerRegistry(
+        failure_threshold=float(os.getenv("LLM_BREAKER_FAILURE_RATE", 0.5)),
+        window_size=int(os.getenv("LLM_BREAKER_WINDOW", 20)),
+        min_calls=int(os.getenv("LLM_BREAKER_MIN_CALLS", 5)),
+        open_seconds=float(os.getenv("LLM_BREAKER_OPEN_SECONDS", 30)),
+    ),
+    ledger=TokenLedger(
+        default_budget=int(os.getenv("LLM_TOKEN_BUDGET", 0)),
+        tenant_budgets=parse_budgets(os.getenv("LLM_TENANT_TOKEN_BUDGETS", "")),
+        window_hours=int(os.getenv("LLM_TOKEN_BUDGET_WINDOW_HOURS", 24)),
+    ),
+)
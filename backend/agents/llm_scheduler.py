@@ -0,0 +1,261 @@
+"""
+LLM Scheduler
+Priority-aware work queue in front of every agent Gemini call
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Optional
+
+from agents.profiler import span
+
+
+# Priority classes, highest first
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+PRIORITY_BULK = "bulk"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND, PRIORITY_BULK)
+
+# Per-request context, set by the API layer and read wherever an LLM call is made
+current_priority = contextvars.ContextVar("asca_llm_priority", default=PRIORITY_INTERACTIVE)
+current_tenant = contextvars.ContextVar("asca_llm_tenant", default="anonymous")
+current_student = contextvars.ContextVar("asca_llm_student", default=None)
+
+
+@contextmanager
+def llm_request_context(
+    priority: Optional[str] = None,
+    tenant: Optional[str] = None,
+    student: Optional[str] = None
+):
+    """
+    Tag every LLM call made inside the block with a priority class and tenant
+
+    Args:
+        priority: One of PRIORITIES; unknown values fall back to interactive
+        tenant: Tenant/student identifier used for fair sharing and token budgets
+        student: Student identifier for token usage attribution
+    """
+    tokens = []
+    if priority is not None:
+        if priority not in PRIORITIES:
+            priority = PRIORITY_INTERACTIVE
+        tokens.append((current_priority, current_priority.set(priority)))
+    if tenant:
+        tokens.append((current_tenant, current_tenant.set(tenant)))
+    if student:
+        tokens.append((current_student, current_student.set(student)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class LLMScheduler:
+    """
+    Admits LLM calls by priority class with weighted fair sharing per tenant
+
+    Interactive calls always go first. Background and bulk calls only run on
+    the slots left after `interactive_reserved` are set aside, so they soak up
+    spare capacity without delaying interactive requests.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        interactive_reserved: int = 1,
+        tenant_weights: Dict[str, float] = None
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.interactive_reserved = max(0, min(interactive_reserved, self.max_concurrency - 1))
+        self.tenant_weights = tenant_weights or {}
+        self._in_flight = 0
+        # priority -> tenant -> waiting futures
+        self._queues: Dict[str, Dict[str, Deque[asyncio.Future]]] = {p: {} for p in PRIORITIES}
+        # priority -> tenant -> virtual service time (lower is served next)
+        self._virtual_time: Dict[str, Dict[str, float]] = {p: {} for p in PRIORITIES}
+        self._metrics = {p: self._empty_metrics() for p in PRIORITIES}
+
+    @staticmethod
+    def _empty_metrics() -> Dict[str, Any]:
+        return {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "in_flight": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "recent_waits": deque(maxlen=200),
+        }
+
+    async def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking LLM call once the scheduler grants it a slot
+
+        Args:
+            fn: Blocking callable, e.g. model.generate_content
+            *args, **kwargs: Passed through to fn
+
+        Returns:
+            Whatever fn returns; exceptions from fn propagate to the caller
+        """
+        priority = current_priority.get()
+        tenant = current_tenant.get()
+        metrics = self._metrics[priority]
+        metrics["submitted"] += 1
+
+        enqueued_at = time.monotonic()
+        with span("llm.queue_wait", priority=priority):
+            await self._acquire(priority, tenant)
+        waited = time.monotonic() - enqueued_at
+        metrics["total_wait_seconds"] += waited
+        metrics["max_wait_seconds"] = max(metrics["max_wait_seconds"], waited)
+        metrics["recent_waits"].append(waited)
+        metrics["in_flight"] += 1
+
+        try:
+            with span("llm.call"):
+                result = await asyncio.to_thread(fn, *args, **kwargs)
+            metrics["completed"] += 1
+            return result
+        except Exception:
+            metrics["failed"] += 1
+            raise
+        finally:
+            metrics["in_flight"] -= 1
+            self._release()
+
+    async def _acquire(self, priority: str, tenant: str):
+        """Wait until a slot is granted to this priority/tenant"""
+        queue = self._queues[priority].get(tenant)
+        if queue is None:
+            # A tenant becoming active starts level with the least-served active
+            # peer so idle history neither starves others nor starves the tenant
+            active = self._virtual_time[priority].values()
+            self._virtual_time[priority][tenant] = min(active) if active else 0.0
+            queue = self._queues[priority][tenant] = deque()
+
+        future = asyncio.get_running_loop().create_future()
+        queue.append(future)
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was granted just before cancellation; give it back
+                self._release()
+            elif future in queue:
+                queue.remove(future)
+                self._drop_if_idle(priority, tenant)
+            raise
+
+    def _drop_if_idle(self, priority: str, tenant: str):
+        """Forget a tenant whose queue drained, so only active tenants are tracked"""
+        queue = self._queues[priority].get(tenant)
+        if queue is not None and not queue:
+            del self._queues[priority][tenant]
+            del self._virtual_time[priority][tenant]
+
+    def _release(self):
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _capacity_for(self, priority: str) -> int:
+        if priority == PRIORITY_INTERACTIVE:
+            return self.max_concurrency
+        return self.max_concurrency - self.interactive_reserved
+
+    def _dispatch(self):
+        """Grant free slots to waiters, highest priority class first"""
+        while self._in_flight < self.max_concurrency:
+            granted = False
+            for priority in PRIORITIES:
+                if self._in_flight >= self._capacity_for(priority):
+                    continue
+                tenant = self._next_tenant(priority)
+                if tenant is None:
+                    continue
+                future = self._queues[priority][tenant].popleft()
+                granted = True
+                if future.done():
+                    # Cancelled while queued; look again from the top
+                    self._drop_if_idle(priority, tenant)
+                    break
+                weight = self.tenant_weights.get(tenant, 1.0) or 1.0
+                self._virtual_time[priority][tenant] += 1.0 / weight
+                self._drop_if_idle(priority, tenant)
+                self._in_flight += 1
+                future.set_result(True)
+                break
+            if not granted:
+                return
+
+    def _next_tenant(self, priority: str) -> Optional[str]:
+        """Pick the waiting tenant with the least weighted service so far"""
+        # Queues are dropped as they drain, so every tracked tenant is waiting
+        times = self._virtual_time[priority]
+        if not times:
+            return None
+        return min(times, key=times.get)
+
+    def queue_depth(self) -> int:
+        """Calls currently waiting for a slot, across all priority classes"""
+        return sum(len(q) for queues in self._queues.values() for q in queues.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of queue depth and queue-time metrics per priority class
+
+        Returns:
+            Dict with global slot usage and per-class counters
+        """
+        classes = {}
+        for priority in PRIORITIES:
+            metrics = self._metrics[priority]
+            waits = sorted(metrics["recent_waits"])
+            started = metrics["completed"] + metrics["failed"] + metrics["in_flight"]
+            classes[priority] = {
+                "queued": sum(len(q) for q in self._queues[priority].values()),
+                "in_flight": metrics["in_flight"],
+                "submitted": metrics["submitted"],
+                "completed": metrics["completed"],
+                "failed": metrics["failed"],
+                "avg_wait_ms": round(1000 * metrics["total_wait_seconds"] / started, 1) if started else 0.0,
+                "p95_wait_ms": round(1000 * waits[int(0.95 * (len(waits) - 1))], 1) if waits else 0.0,
+                "max_wait_ms": round(1000 * metrics["max_wait_seconds"], 1),
+            }
+        return {
+            "max_concurrency": self.max_concurrency,
+            "interactive_reserved": self.interactive_reserved,
+            "in_flight": self._in_flight,
+            "queue_depth": sum(c["queued"] for c in classes.values()),
+            "classes": classes,
+        }
+
+
+def _parse_weights(raw: str) -> Dict[str, float]:
+    """Parse "tenantA=2,tenantB=0.5" into a weight map"""
+    weights = {}
+    for item in (raw or "").split(","):
+        if "=" not in item:
+            continue
+        name, value = item.split("=", 1)
+        try:
+            weights[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return weights
+
+
+# Shared scheduler used by all agents
+llm_scheduler = LLMScheduler(
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 4)),
+    interactive_reserved=int(os.getenv("LLM_INTERACTIVE_RESERVED", 1)),
+    tenant_weights=_parse_weights(os.getenv("LLM_TENANT_WEIGHTS", "")),
+)
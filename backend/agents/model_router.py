@@ -0,0 +1,191 @@
+"""
+Model Router
+Picks a fast or strong Gemini model per task and escalates on invalid output
+"""
+
+import json
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Dict
+
+import google.generativeai as genai
+
+from agents.llm_client import llm_client
+from agents.profiler import span
+
+
+TIER_FAST = "fast"
+TIER_STRONG = "strong"
+TIERS = (TIER_FAST, TIER_STRONG)
+
+# Agent tasks and the tier they start on; "auto" picks by prompt size
+TASK_ASSIGNMENT_ANALYSIS = "assignment_analysis"
+TASK_WORKLOAD_RECOMMENDATIONS = "workload_recommendations"
+TASK_SCHEDULE = "schedule"
+TASK_WELLNESS_ASSESSMENT = "wellness_assessment"
+TASK_BREAK_SUGGESTION = "break_suggestion"
+DEFAULT_TASK_TIERS = {
+    TASK_ASSIGNMENT_ANALYSIS: "auto",
+    TASK_WORKLOAD_RECOMMENDATIONS: TIER_FAST,
+    TASK_SCHEDULE: TIER_STRONG,
+    TASK_WELLNESS_ASSESSMENT: TIER_STRONG,
+    TASK_BREAK_SUGGESTION: TIER_FAST,
+}
+
+
+class InvalidModelOutput(ValueError):
+    """LLM output that could not be parsed or failed validation"""
+
+
+def extract_json(text: str) -> Any:
+    """Parse a JSON response, tolerating a ```json fence around it"""
+    text = (text or "").strip()
+    if text.startswith('```json'):
+        text = text[7:]
+    elif text.startswith('```'):
+        text = text[3:]
+    if text.endswith('```'):
+        text = text[:-3]
+    try:
+        return json.loads(text.strip())
+    except ValueError as e:
+        raise InvalidModelOutput(f"Response is not JSON: {e}")
+
+
+def parse_task_tiers(raw: str) -> Dict[str, str]:
+    """Parse "schedule=fast,break_suggestion=strong" into task tier overrides"""
+    tiers = {}
+    for item in (raw or "").split(","):
+        if "=" not in item:
+            continue
+        task, tier = (part.strip() for part in item.split("=", 1))
+        if tier in TIERS or tier == "auto":
+            tiers[task] = tier
+    return tiers
+
+
+class ModelRouter:
+    """
+    Routes each agent task to a model tier
+
+    Simple tasks (break suggestions, recommendations, short assignments) start
+    on the fast tier; schedules and wellness assessments start on the strong
+    tier. When the fast model's output fails the caller's parser/validator,
+    the same prompt is retried once on the strong model. Transport errors
+    (open breaker, exhausted budget, API errors) propagate unchanged so agents
+    take their usual local fallbacks.
+    """
+
+    def __init__(
+        self,
+        fast_model: str = "gemini-1.5-flash",
+        strong_model: str = "gemini-pro",
+        task_tiers: Dict[str, str] = None,
+        small_prompt_chars: int = 1200
+    ):
+        self.model_names = {TIER_FAST: fast_model, TIER_STRONG: strong_model}
+        self.task_tiers = {**DEFAULT_TASK_TIERS, **(task_tiers or {})}
+        self.small_prompt_chars = small_prompt_chars
+        self._models: Dict[str, Any] = {}
+        self._metrics = {tier: self._empty_metrics() for tier in TIERS}
+
+    @staticmethod
+    def _empty_metrics() -> Dict[str, Any]:
+        return {
+            "calls": 0,
+            "valid": 0,
+            "invalid": 0,
+            "errors": 0,
+            "escalations": 0,
+            "total_latency_seconds": 0.0,
+            "recent_latencies": deque(maxlen=500),
+            "by_task": {},
+        }
+
+    def model_for(self, tier: str) -> Any:
+        model = self._models.get(tier)
+        if model is None:
+            model = self._models[tier] = genai.GenerativeModel(self.model_names[tier])
+        return model
+
+    def choose_tier(self, task: str, prompt: str) -> str:
+        tier = self.task_tiers.get(task, TIER_STRONG)
+        if tier == "auto":
+            tier = TIER_FAST if len(prompt) <= self.small_prompt_chars else TIER_STRONG
+        return tier
+
+    async def generate(self, task: str, prompt: str, parse: Callable[[str], Any], agent: str = "unknown") -> Any:
+        """
+        Generate and parse a response, escalating to the strong tier on invalid output
+
+        Args:
+            task: One of the TASK_* names; decides the starting tier
+            prompt: Prompt text
+            parse: Turns response text into the agent's result; raises
+                InvalidModelOutput (or ValueError/KeyError/TypeError) when the
+                output is unusable
+            agent: Calling agent's name, for usage attribution
+
+        Returns:
+            Whatever `parse` returns
+        """
+        tier = self.choose_tier(task, prompt)
+        while True:
+            metrics = self._metrics[tier]
+            task_counts = metrics["by_task"].setdefault(task, {"calls": 0, "invalid": 0})
+            metrics["calls"] += 1
+            task_counts["calls"] += 1
+
+            started = time.monotonic()
+            try:
+                response = await llm_client.generate(self.model_for(tier), prompt, agent=agent)
+            except Exception:
+                metrics["errors"] += 1
+                raise
+            latency = time.monotonic() - started
+            metrics["total_latency_seconds"] += latency
+            metrics["recent_latencies"].append(latency)
+
+            try:
+                with span("parse"):
+                    result = parse(response.text)
+            except (ValueError, KeyError, TypeError) as e:
+                metrics["invalid"] += 1
+                task_counts["invalid"] += 1
+                if tier == TIER_STRONG:
+                    raise InvalidModelOutput(f"{task} output invalid on strong tier: {e}")
+                metrics["escalations"] += 1
+                tier = TIER_STRONG
+                continue
+            metrics["valid"] += 1
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-tier latency, validation pass rate and escalation counts"""
+        tiers = {}
+        for tier, m in self._metrics.items():
+            recent = sorted(m["recent_latencies"])
+            answered = m["valid"] + m["invalid"]
+            tiers[tier] = {
+                "model": self.model_names[tier],
+                "calls": m["calls"],
+                "valid": m["valid"],
+                "invalid": m["invalid"],
+                "errors": m["errors"],
+                "escalations": m["escalations"],
+                "validation_pass_rate": round(m["valid"] / answered, 3) if answered else None,
+                "avg_latency_ms": round(m["total_latency_seconds"] / answered * 1000, 1) if answered else 0.0,
+                "p95_latency_ms": round(recent[int(0.95 * (len(recent) - 1))] * 1000, 1) if recent else 0.0,
+                "by_task": m["by_task"],
+            }
+        return {"task_tiers": self.task_tiers, "tiers": tiers}
+
+
+# Shared router used by all agents
+model_router = ModelRouter(
+    fast_model=os.getenv("LLM_FAST_MODEL", "gemini-1.5-flash"),
+    strong_model=os.getenv("LLM_STRONG_MODEL", "gemini-pro"),
+    task_tiers=parse_task_tiers(os.getenv("LLM_TASK_TIERS", "")),
+    small_prompt_chars=int(os.getenv("LLM_SMALL_PROMPT_CHARS", 1200)),
+)
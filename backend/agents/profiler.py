@@ -0,0 +1,225 @@
+"""
+Request Profiler
+Opt-in per-request span timeline and CPU profile, stored locally for admins
+"""
+
+import contextvars
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+# Span name prefixes summed into the per-phase breakdown
+PHASES = ("handler", "agent", "llm.queue_wait", "llm.call", "parse", "serialize")
+
+_current_profile = contextvars.ContextVar("asca_profile", default=None)
+_current_span = contextvars.ContextVar("asca_profile_span", default=None)
+
+
+def _phase_of(name: str) -> Optional[str]:
+    for phase in PHASES:
+        if name == phase or name.startswith(phase + "."):
+            return phase
+    return None
+
+
+class RequestProfile:
+    """Spans and CPU usage collected while one request is handled"""
+
+    def __init__(self, method: str, path: str, student_id: Optional[str] = None, cpu_profile: bool = False):
+        self.profile_id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.student_id = student_id
+        self.created_at = datetime.now().isoformat()
+        self.spans: List[Dict[str, Any]] = []
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        self._profiler = cProfile.Profile() if cpu_profile else None
+
+    def offset_ms(self) -> float:
+        return round((time.perf_counter() - self._started) * 1000, 3)
+
+    def finish(self, status_code: int, top_functions: int = 25) -> Dict[str, Any]:
+        total_ms = self.offset_ms()
+        phases = {phase: 0.0 for phase in PHASES}
+        span_phases = [_phase_of(s['name']) for s in self.spans]
+        for i, s in enumerate(self.spans):
+            phase = span_phases[i]
+            if phase is None or 'duration_ms' not in s:
+                continue
+            # Only the outermost span of a phase counts, so nested agent calls aren't summed twice
+            parent = s['parent']
+            while parent is not None and span_phases[parent] != phase:
+                parent = self.spans[parent]['parent']
+            if parent is None:
+                phases[phase] += s['duration_ms']
+        handler_starts = [s['start_ms'] for s in self.spans if s['name'].startswith("handler")]
+        # Time before the handler runs is routing, body read and Pydantic validation
+        phases["before_handler"] = min(handler_starts) if handler_starts else None
+
+        return {
+            "profile_id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "student_id": self.student_id,
+            "status_code": status_code,
+            "created_at": self.created_at,
+            "wall_ms": total_ms,
+            "process_cpu_ms": round((time.process_time() - self._cpu_started) * 1000, 3),
+            "phases_ms": {k: round(v, 3) if v is not None else None for k, v in phases.items()},
+            "spans": sorted(self.spans, key=lambda s: s['start_ms']),
+            "cpu_profile": self._cpu_stats(top_functions) if self._profiler else None,
+        }
+
+    def _cpu_stats(self, limit: int) -> List[Dict[str, Any]]:
+        stats = pstats.Stats(self._profiler, stream=io.StringIO())
+        rows = []
+        for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                "function": f"{os.path.basename(filename)}:{line}({func})",
+                "calls": calls,
+                "tottime_ms": round(tottime * 1000, 3),
+                "cumtime_ms": round(cumtime * 1000, 3),
+            })
+        rows.sort(key=lambda r: r['tottime_ms'], reverse=True)
+        return rows[:limit]
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a block as a named span of the current request's profile
+
+    A no-op unless the request is being profiled.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    parent = _current_span.get()
+    record = {"name": name, "start_ms": profile.offset_ms(), "parent": parent}
+    if attributes:
+        record["attributes"] = attributes
+    profile.spans.append(record)
+    span_id = len(profile.spans) - 1
+    token = _current_span.set(span_id)
+    try:
+        yield
+    finally:
+        _current_span.reset(token)
+        record["duration_ms"] = round(profile.offset_ms() - record["start_ms"], 3)
+
+
+def profiled(name: str):
+    """Decorator wrapping an async agent method in a span"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if _current_profile.get() is None:
+                return await fn(*args, **kwargs)
+            with span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and keeps the newest captures on disk
+
+    A request is profiled when it carries the trigger header or is picked by
+    `sample_rate`. Captures are JSON files in `directory`; beyond
+    `max_profiles` the oldest are deleted. cProfile is process-wide, so only
+    one request at a time gets a CPU profile; concurrent captures still get
+    their span timeline.
+    """
+
+    def __init__(self, directory: str = "profiles", sample_rate: float = 0.0, max_profiles: int = 100):
+        self.directory = directory
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.max_profiles = max(1, max_profiles)
+        self._cpu_busy = False
+
+    def should_profile(self, requested: bool) -> bool:
+        return requested or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    @contextmanager
+    def capture(self, method: str, path: str, student_id: Optional[str] = None):
+        """Activate a profile for the enclosed request handling"""
+        cpu_profile = not self._cpu_busy
+        profile = RequestProfile(method, path, student_id, cpu_profile=cpu_profile)
+        token = _current_profile.set(profile)
+        if cpu_profile:
+            self._cpu_busy = True
+            profile._profiler.enable()
+        try:
+            yield profile
+        finally:
+            if cpu_profile:
+                profile._profiler.disable()
+                self._cpu_busy = False
+            _current_profile.reset(token)
+
+    def save(self, capture: Dict[str, Any]):
+        """Write a finished capture and enforce the retention cap (blocking I/O)"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{capture['profile_id']}.json")
+        with open(path, "w") as f:
+            json.dump(capture, f)
+        files = self._files()
+        for old in files[:max(0, len(files) - self.max_profiles)]:
+            os.remove(old)
+
+    def _files(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        paths = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".json")
+        ]
+        return sorted(paths, key=os.path.getmtime)
+
+    def list(self, student_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Summaries of stored captures, newest first"""
+        summaries = []
+        for path in reversed(self._files()):
+            try:
+                with open(path) as f:
+                    capture = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if student_id and capture.get('student_id') != student_id:
+                continue
+            summaries.append({
+                k: capture.get(k)
+                for k in ("profile_id", "method", "path", "student_id", "status_code", "created_at", "wall_ms", "process_cpu_ms", "phases_ms")
+            })
+        return summaries
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        if not profile_id.isalnum():
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+
+# Shared profiler used by the API middleware
+request_profiler = RequestProfiler(
+    directory=os.getenv("PROFILE_DIR", "profiles"),
+    sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", 0)),
+    max_profiles=int(os.getenv("PROFILE_MAX_ENTRIES", 100)),
+)
@@ -0,0 +1,125 @@
+"""
+Quantized Prompt Memo
+Reuses LLM outputs across students whose prompt inputs fall in the same coarse bins
+"""
+
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+# Bin width per input; 0 keeps the exact value
+DEFAULT_BINS = {
+    "assignments": 2,
+    "total_hours": 5,
+    "high_priority": 1,
+    "complexity": 1,
+    "daily_hours": 1,
+    "stress": 2,
+    "sleep": 1,
+    "energy": 2,
+}
+
+
+def parse_bins(raw: str) -> Dict[str, float]:
+    """Parse "total_hours=10,stress=3" into bin width overrides"""
+    bins = {}
+    for item in (raw or "").split(","):
+        if "=" not in item:
+            continue
+        name, value = item.split("=", 1)
+        try:
+            bins[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return bins
+
+
+def _tidy(number: float) -> Any:
+    return int(number) if float(number).is_integer() else round(number, 3)
+
+
+class QuantizedMemo:
+    """
+    TTL memo keyed by binned numeric inputs
+
+    Numeric inputs are floored to their bin width, so every student whose
+    aggregates land in the same bins shares one generated output until it is
+    `ttl_seconds` old. Callers render their prompt from `describe()` labels
+    rather than exact values, so the stored output is valid for the whole bin.
+    A TTL of 0 disables the memo.
+    """
+
+    def __init__(self, bins: Dict[str, float] = None, ttl_seconds: float = 3600, max_entries: int = 1000):
+        self.bins = {**DEFAULT_BINS, **(bins or {})}
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def bucket(self, field: str, value: Any) -> Any:
+        """Lower edge of the value's bin (non-numeric or unbinned values pass through)"""
+        width = self.bins.get(field, 0)
+        if width <= 0 or isinstance(value, bool) or not isinstance(value, (int, float)):
+            return value
+        return _tidy(math.floor(value / width) * width)
+
+    def describe(self, field: str, value: Any) -> str:
+        """Prompt label for a value: its bin range, or the value itself when unbinned"""
+        width = self.bins.get(field, 0)
+        if not self.enabled or width <= 0 or isinstance(value, bool) or not isinstance(value, (int, float)):
+            return str(value)
+        edge = self.bucket(field, value)
+        if isinstance(value, int) and float(width).is_integer():
+            # Integer inputs get an inclusive range, e.g. 2-3 for width 2
+            upper = edge + int(width) - 1
+            return str(edge) if upper == edge else f"{edge}-{upper}"
+        return f"{edge}-{_tidy(edge + width)}"
+
+    def key(self, **values) -> Tuple:
+        return tuple((name, self.bucket(name, values[name])) for name in sorted(values))
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """Stored output for the bin, or None if missing or stale"""
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Tuple, value: Any):
+        if not self.enabled:
+            return
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "ttl_seconds": self.ttl_seconds,
+            "bins": self.bins,
+        }
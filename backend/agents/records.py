@@ -0,0 +1,187 @@
+"""
+Agent Records
+Slotted, typed internal records passed between agents without copying
+"""
+
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, Dict, List, Optional
+
+from agents.timeline import parse_time_range
+
+
+def _number(value: Any) -> Optional[float]:
+    """Coerce an LLM-provided number (possibly a string) once, at parse time"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        number = float(str(value).strip())
+    except ValueError:
+        return None
+    return int(number) if number.is_integer() else number
+
+
+class Record:
+    """
+    Read-compatible with the dicts agents used to exchange (`get`, `[]`)
+
+    Unknown keys from the LLM are kept in `extra`. `to_dict` produces the wire
+    format once, at the response/persistence boundary; unset fields are
+    omitted so the JSON shape matches what the LLM returned.
+    """
+
+    __slots__ = ()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._field_names():
+            value = getattr(self, key)
+            return default if value is None else value
+        return self.extra.get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    @classmethod
+    def _field_names(cls):
+        names = cls.__dict__.get('_names')
+        if names is None:
+            names = frozenset(f.name for f in fields(cls) if f.name != 'extra')
+            setattr(cls, '_names', names)
+        return names
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Record":
+        names = cls._field_names()
+        known = {k: v for k, v in data.items() if k in names}
+        extra = {k: v for k, v in data.items() if k not in names}
+        return cls(**known, extra=extra)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            name: getattr(self, name)
+            for name in self._wire_order
+            if getattr(self, name) is not None
+        }
+        data.update(self.extra)
+        return data
+
+    def copy(self) -> "Record":
+        """Shallow copy with its own `extra` dict"""
+        return replace(self, extra=dict(self.extra))
+
+
+_MISSING = object()
+
+
+@dataclass(slots=True)
+class AssignmentAnalysis(Record):
+    """One assignment's analysis from the Assignment Analyzer"""
+
+    assignment_id: Optional[str] = None
+    complexity_score: Optional[float] = None
+    estimated_hours: Optional[float] = None
+    priority_level: Optional[str] = None
+    key_tasks: Optional[List[str]] = None
+    recommended_start_date: Optional[str] = None
+    reasoning: Optional[str] = None
+    analyzed_at: Optional[str] = None
+    source: Optional[str] = None
+    reused_from: Optional[Dict[str, Any]] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    _wire_order = (
+        "complexity_score", "estimated_hours", "priority_level", "key_tasks",
+        "recommended_start_date", "reasoning", "assignment_id", "analyzed_at",
+        "source", "reused_from",
+    )
+
+    @classmethod
+    def from_llm(cls, data: Dict[str, Any]) -> "AssignmentAnalysis":
+        record = cls.from_dict(data)
+        record.complexity_score = _number(record.complexity_score)
+        record.estimated_hours = _number(record.estimated_hours)
+        return record
+
+
+@dataclass(slots=True)
+class ScheduleSession(Record):
+    """One time block of a day's schedule; the time range is parsed once"""
+
+    time: Optional[str] = None
+    type: Optional[str] = None
+    assignment: Optional[str] = None
+    task: Optional[str] = None
+    activity: Optional[str] = None
+    start_minute: Optional[int] = None
+    end_minute: Optional[int] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    _wire_order = ("time", "assignment", "task", "type", "activity")
+
+    @classmethod
+    def from_llm(cls, data: Dict[str, Any]) -> "ScheduleSession":
+        record = cls.from_dict(data)
+        block = parse_time_range(record.time)
+        if block:
+            record.start_minute, record.end_minute = block
+        return record
+
+    @property
+    def duration_minutes(self) -> int:
+        if self.start_minute is None or self.end_minute is None:
+            return 60
+        return self.end_minute - self.start_minute
+
+
+@dataclass(slots=True)
+class WellnessAssessment(Record):
+    """Wellness Monitor assessment"""
+
+    wellness_score: Optional[float] = None
+    risk_level: Optional[str] = None
+    risk_factors: Optional[List[str]] = None
+    recommendations: Optional[List[Any]] = None
+    wellness_activities: Optional[List[str]] = None
+    alert_threshold: Optional[str] = None
+    positive_aspects: Optional[List[str]] = None
+    assessed_at: Optional[str] = None
+    assessed_by: Optional[str] = None
+    trends: Optional[Dict[str, Any]] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    _wire_order = (
+        "wellness_score", "risk_level", "risk_factors", "recommendations",
+        "wellness_activities", "alert_threshold", "positive_aspects",
+        "assessed_at", "assessed_by", "trends",
+    )
+
+    @classmethod
+    def from_llm(cls, data: Dict[str, Any]) -> "WellnessAssessment":
+        record = cls.from_dict(data)
+        record.wellness_score = _number(record.wellness_score)
+        return record
+
+
+def wire_default(obj: Any) -> Any:
+    """`json.dumps(default=...)` hook: records serialize straight to the wire format"""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def to_wire(obj: Any) -> Any:
+    """Recursively convert records inside dicts/lists to plain JSON-ready values"""
+    if isinstance(obj, Record):
+        return to_wire(obj.to_dict())
+    if isinstance(obj, dict):
+        return {k: to_wire(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [to_wire(v) for v in obj]
+    return obj
@@ -6,7 +6,54 @@ Creates optimal study schedules based on assignment analysis
 import google.generativeai as genai
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
-import json
+import copy
+
+from agents.model_router import model_router, extract_json, InvalidModelOutput, TASK_SCHEDULE
+from agents.admission import note_fallback
+from agents.profiler import profiled
+from agents.records import ScheduleSession
+from agents.timeline import (
+    DayTimeline, ScheduleTimeline, MINUTES_PER_DAY,
+    format_time_range, parse_clock, parse_time_range, session_range
+)
+
+
+DEFAULT_PREFERENCES = {
+    "daily_study_hours": 6,
+    "preferred_start_time": "09:00",
+    "break_frequency": 60,  # minutes
+    "break_duration": 15,  # minutes
+}
+
+
+def _require_clock(value: str, name: str) -> int:
+    minute = parse_clock(value)
+    if minute is None:
+        raise ValueError(f"{name} must be HH:MM, got {value!r}")
+    return minute
+
+
+def _require_schedule_shape(daily_schedules: List[Dict[str, Any]]):
+    """Raise ValueError unless every day is an object holding a list of session objects"""
+    for day in daily_schedules:
+        if not isinstance(day, dict) or not isinstance(day.get('sessions', []), list):
+            raise ValueError("Each daily schedule must be an object with a list of sessions")
+        if not isinstance(day.get('date', ''), str):
+            raise ValueError("Daily schedule dates must be YYYY-MM-DD strings")
+        if not all(isinstance(s, (dict, ScheduleSession)) for s in day.get('sessions', [])):
+            raise ValueError("Each schedule session must be an object")
+
+
+def _parse_schedule(text: str) -> Dict[str, Any]:
+    schedule = extract_json(text)
+    if not isinstance(schedule, dict) or not isinstance(schedule.get('daily_schedules'), list) or not schedule['daily_schedules']:
+        raise InvalidModelOutput("daily_schedules missing or empty")
+    for day in schedule['daily_schedules']:
+        if not isinstance(day, dict) or not isinstance(day.get('sessions'), list):
+            raise InvalidModelOutput("every day needs a sessions list")
+        # Parse each session's time range once; later stages read the typed fields
+        day['sessions'] = [ScheduleSession.from_llm(s) for s in day['sessions'] if isinstance(s, dict)]
+    return schedule
 
 
 class ScheduleOptimizerAgent:
@@ -14,13 +61,14 @@ class ScheduleOptimizerAgent:
     
     def __init__(self, api_key: str):
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
         self.name = "Schedule Optimizer"
         
+    @profiled("agent.schedule_optimizer.create_schedule")
     async def create_schedule(
         self, 
         workload_analysis: Dict[str, Any],
-        student_preferences: Dict[str, Any] = None
+        student_preferences: Dict[str, Any] = None,
+        commitments: List[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Create an optimized study schedule based on workload analysis
@@ -28,17 +76,13 @@ class ScheduleOptimizerAgent:
         Args:
             workload_analysis: Output from Assignment Analyzer Agent
             student_preferences: Optional preferences (study hours, break frequency, etc.)
+            commitments: Optional fixed calendar events (from parse_ics) to schedule around
             
         Returns:
             Optimized schedule with daily tasks and time blocks
         """
         if student_preferences is None:
-            student_preferences = {
-                "daily_study_hours": 6,
-                "preferred_start_time": "09:00",
-                "break_frequency": 60,  # minutes
-                "break_duration": 15,  # minutes
-            }
+            student_preferences = dict(DEFAULT_PREFERENCES)
         
         analyses = workload_analysis.get('individual_analyses', [])
         
@@ -74,7 +118,7 @@ STUDENT PREFERENCES:
 - Preferred start time: {student_preferences.get('preferred_start_time', '09:00')}
 - Break every: {student_preferences.get('break_frequency', 60)} minutes
 - Break duration: {student_preferences.get('break_duration', 15)} minutes
-
+{self._format_commitments(commitments)}
 Create a 7-day optimized schedule that:
 1. Prioritizes high-priority and high-complexity assignments
 2. Distributes work evenly to avoid burnout
@@ -110,79 +154,380 @@ Return as JSON:
 """
         
         try:
-            response = self.model.generate_content(prompt)
-            text = response.text.strip()
-            if text.startswith('```json'):
-                text = text[7:]
-            if text.endswith('```'):
-                text = text[:-3]
-            
-            schedule = json.loads(text.strip())
+            schedule = await model_router.generate(
+                TASK_SCHEDULE,
+                prompt,
+                lambda text: self._validated_schedule(text, commitments),
+                agent=self.name
+            )
             schedule['created_at'] = datetime.now().isoformat()
             schedule['created_by'] = self.name
+            if commitments:
+                schedule['commitments'] = commitments
             
             return schedule
             
         except Exception as e:
             print(f"Error creating schedule: {e}")
+            note_fallback(self.name)
             # Return basic schedule
-            return self._create_basic_schedule(analyses, student_preferences)
+            return self._create_basic_schedule(analyses, student_preferences, commitments)
+    
+    def _validated_schedule(self, text: str, commitments: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Parse an LLM schedule and reject it if sessions overlap or hit a commitment"""
+        schedule = _parse_schedule(text)
+        # A block with an unreadable time is dropped on its own rather than failing the schedule
+        for day in schedule['daily_schedules']:
+            day['sessions'] = [s for s in day['sessions'] if session_range(s) is not None]
+        issues = self.check_schedule(schedule['daily_schedules'], commitments)
+        if issues:
+            first = issues[0]
+            raise InvalidModelOutput(f"{len(issues)} schedule issue(s), first: {first['issue']} on {first['date']} {first['time']}")
+        return schedule
+    
+    @staticmethod
+    def _format_commitments(commitments: List[Dict[str, Any]] = None) -> str:
+        """Prompt section listing the week's fixed commitments"""
+        if not commitments:
+            return ""
+        today = datetime.now().date()
+        horizon = (today + timedelta(days=7)).isoformat()
+        week = [c for c in commitments if today.isoformat() <= c['date'] < horizon]
+        if not week:
+            return ""
+        lines = "\n".join(f"- {c['date']} {c['time']}: {c['summary']}" for c in week)
+        return f"""
+FIXED COMMITMENTS (never schedule sessions over these):
+{lines}
+"""
     
     def _create_basic_schedule(
         self, 
         analyses: List[Dict[str, Any]], 
-        preferences: Dict[str, Any]
+        preferences: Dict[str, Any],
+        commitments: List[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        """Create a simple fallback schedule"""
+        """Create a simple fallback schedule around any fixed commitments"""
         daily_schedules = []
         start_date = datetime.now()
+        timeline = ScheduleTimeline()
+        timeline.add_commitments(commitments or [])
+        day_start = _require_clock(preferences.get('preferred_start_time') or '09:00', 'preferred_start_time')
         
         for day_offset in range(7):
             current_date = start_date + timedelta(days=day_offset)
-            day_name = current_date.strftime("%A")
+            date = current_date.strftime("%Y-%m-%d")
+            day = timeline.day(date)
             
             sessions = []
-            current_time = datetime.strptime(preferences.get('preferred_start_time', '09:00'), '%H:%M')
+            cursor = day_start
             
-            # Add 2-3 study sessions per day
-            for i in range(min(3, len(analyses))):
-                if i < len(analyses):
-                    analysis = analyses[i]
-                    session_end = current_time + timedelta(hours=1)
-                    
-                    sessions.append({
-                        "time": f"{current_time.strftime('%H:%M')}-{session_end.strftime('%H:%M')}",
-                        "assignment": analysis.get('assignment_id', 'Unknown'),
-                        "task": analysis.get('key_tasks', ['Study'])[0] if analysis.get('key_tasks') else 'Study',
-                        "type": "work"
-                    })
-                    
-                    current_time = session_end
-                    
-                    # Add break
-                    break_end = current_time + timedelta(minutes=15)
-                    sessions.append({
-                        "time": f"{current_time.strftime('%H:%M')}-{break_end.strftime('%H:%M')}",
-                        "type": "break",
-                        "activity": "rest"
-                    })
-                    current_time = break_end
+            # Add 2-3 study sessions per day, each in the next free hour
+            for analysis in analyses[:3]:
+                start = day.first_free(60, cursor)
+                if start is None:
+                    break
+                day.occupy(start, start + 60)
+                sessions.append(ScheduleSession(
+                    time=format_time_range(start, start + 60),
+                    assignment=analysis.get('assignment_id', 'Unknown'),
+                    task=analysis.get('key_tasks', ['Study'])[0] if analysis.get('key_tasks') else 'Study',
+                    type="work",
+                    start_minute=start,
+                    end_minute=start + 60
+                ))
+                cursor = start + 60
+                
+                # Add break
+                if cursor + 15 <= MINUTES_PER_DAY and day.is_free(cursor, cursor + 15):
+                    day.occupy(cursor, cursor + 15)
+                    sessions.append(ScheduleSession(
+                        time=format_time_range(cursor, cursor + 15),
+                        type="break",
+                        activity="rest",
+                        start_minute=cursor,
+                        end_minute=cursor + 15
+                    ))
+                    cursor += 15
             
             daily_schedules.append({
-                "day": day_name,
-                "date": current_date.strftime("%Y-%m-%d"),
+                "day": current_date.strftime("%A"),
+                "date": date,
                 "sessions": sessions,
-                "total_hours": len([s for s in sessions if s['type'] == 'work'])
+                "total_hours": len([s for s in sessions if s.type == 'work'])
             })
         
-        return {
+        schedule = {
             "daily_schedules": daily_schedules,
             "optimization_notes": ["Basic schedule created", "Adjust as needed"],
             "flexibility_score": 7,
             "created_at": datetime.now().isoformat(),
             "created_by": self.name
         }
+        if commitments:
+            schedule['commitments'] = commitments
+        return schedule
+    
+    def check_schedule(
+        self,
+        daily_schedules: List[Dict[str, Any]],
+        commitments: List[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Check a schedule for malformed times, overlaps and commitment conflicts (no LLM)
+        
+        Returns:
+            List of issues; empty when the schedule is consistent
+        
+        Raises:
+            ValueError: The schedule is not a list of days with session objects
+        """
+        _require_schedule_shape(daily_schedules)
+        timeline = ScheduleTimeline()
+        timeline.add_commitments(commitments or [])
+        return timeline.validate(daily_schedules)
+    
+    def find_free_slots(
+        self,
+        daily_schedules: List[Dict[str, Any]],
+        duration_minutes: int = 60,
+        earliest: str = "08:00",
+        latest: str = "22:00",
+        dates: List[str] = None,
+        commitments: List[Dict[str, Any]] = None
+    ) -> Dict[str, List[str]]:
+        """
+        Free time blocks of at least `duration_minutes` per day, around sessions and commitments
+        
+        Returns:
+            {date: ["HH:MM-HH:MM", ...]} for the requested dates (default: the schedule's days)
+        
+        Raises:
+            ValueError: Malformed schedule or times, or `earliest` not before `latest`
+        """
+        _require_schedule_shape(daily_schedules)
+        earliest_minute = _require_clock(earliest, 'earliest')
+        latest_minute = MINUTES_PER_DAY if latest == "00:00" else _require_clock(latest, 'latest')
+        if earliest_minute >= latest_minute:
+            raise ValueError(f"earliest ({earliest}) must be before latest ({latest})")
+        timeline = ScheduleTimeline()
+        timeline.add_commitments(commitments or [])
+        timeline.validate(daily_schedules)
+        if not dates:
+            dates = [day.get('date') for day in daily_schedules if day.get('date')]
+        return timeline.free_slots(dates, max(1, duration_minutes), earliest_minute, latest_minute)
+    
+    @profiled("agent.schedule_optimizer.repair_schedule")
+    async def repair_schedule(
+        self,
+        daily_schedules: List[Dict[str, Any]],
+        change: Dict[str, Any],
+        student_preferences: Dict[str, Any] = None,
+        commitments: List[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Locally repair an existing schedule after a change event, without the LLM
+        
+        Args:
+            daily_schedules: The `daily_schedules` list from a previous create_schedule
+            change: Change event with a `type` of missed_session, completed_task,
+                new_deadline or preferences_changed plus its fields
+            student_preferences: Current preferences (study hours, breaks)
+            commitments: Optional fixed calendar events; moved blocks are kept clear of them
+            
+        Returns:
+            Repaired daily schedules with a minimal diff of the sessions touched,
+            plus any remaining issues from the same validation create_schedule applies
+        """
+        preferences = dict(DEFAULT_PREFERENCES)
+        preferences.update({k: v for k, v in (student_preferences or {}).items() if v is not None})
+        if change.get('type') == 'preferences_changed':
+            preferences.update({k: v for k, v in (change.get('preferences') or {}).items() if v is not None})
+        
+        _require_schedule_shape(daily_schedules)
+        days = copy.deepcopy(daily_schedules)
+        timeline = ScheduleTimeline()
+        timeline.add_commitments(commitments or [])
+        diff: List[Dict[str, Any]] = []
+        unplaced: List[Dict[str, Any]] = []
+        change_type = change.get('type')
+        
+        if change_type == 'missed_session':
+            day = self._find_day(days, change.get('date'))
+            session = self._find_session(day, change.get('time')) if day else None
+            if session is None or session.get('type') != 'work':
+                raise ValueError("missed_session requires the date and time of a work session")
+            self._remove_session(day, session, diff)
+            if not self._place_session(days, session, day['date'], change.get('due_date'), preferences, diff, timeline):
+                unplaced.append(session)
+        
+        elif change_type == 'completed_task':
+            if not change.get('assignment_id'):
+                raise ValueError("completed_task requires assignment_id")
+            for day in days:
+                if change.get('date') and day.get('date', '') < change['date']:
+                    continue
+                for session in list(day.get('sessions', [])):
+                    if self._matches(session, change.get('assignment_id'), change.get('task')):
+                        self._remove_session(day, session, diff)
+        
+        elif change_type == 'new_deadline':
+            due_date = change.get('due_date')
+            if not change.get('assignment_id') or not due_date:
+                raise ValueError("new_deadline requires assignment_id and due_date")
+            late = [
+                (day, session)
+                for day in days if day.get('date', '') > due_date
+                for session in day.get('sessions', [])
+                if self._matches(session, change['assignment_id'], None)
+            ]
+            for day, session in late:
+                self._remove_session(day, session, diff)
+            for day, session in late:
+                if not self._place_session(days, session, None, due_date, preferences, diff, timeline):
+                    unplaced.append(session)
+        
+        elif change_type == 'preferences_changed':
+            limit = preferences['daily_study_hours'] * 60
+            start = _require_clock(preferences['preferred_start_time'], 'preferred_start_time')
+            overflow = []
+            for day in days:
+                work = [s for s in day.get('sessions', []) if s.get('type') == 'work']
+                # Keep the earliest blocks that fit the new limit and start time
+                used = 0
+                for session in work:
+                    block = parse_time_range(session.get('time'))
+                    length = block[1] - block[0] if block else 60
+                    if (block and block[0] < start) or used + length > limit:
+                        self._remove_session(day, session, diff)
+                        overflow.append((day['date'], session))
+                    else:
+                        used += length
+            for after_date, session in overflow:
+                if not self._place_session(days, session, after_date, None, preferences, diff, timeline):
+                    unplaced.append(session)
+        
+        else:
+            raise ValueError(f"Unknown change type: {change_type}")
+        
+        affected = sorted({entry['date'] for entry in diff})
+        for day in days:
+            if day.get('date') in affected:
+                day['total_hours'] = self._work_hours(day)
+        
+        return {
+            "daily_schedules": days,
+            "changes": diff,
+            "affected_days": affected,
+            "unplaced_sessions": unplaced,
+            "issues": self.check_schedule(days, commitments),
+            "repaired_at": datetime.now().isoformat(),
+            "repaired_by": self.name
+        }
+    
+    @staticmethod
+    def _find_day(days: List[Dict[str, Any]], date: str):
+        return next((d for d in days if d.get('date') == date), None)
+    
+    @staticmethod
+    def _find_session(day: Dict[str, Any], time: str):
+        return next((s for s in day.get('sessions', []) if s.get('time') == time), None)
+    
+    @staticmethod
+    def _matches(session: Dict[str, Any], assignment_id: str, task: str) -> bool:
+        return (
+            session.get('type') == 'work'
+            and session.get('assignment') == assignment_id
+            and (task is None or session.get('task') == task)
+        )
+    
+    def _work_hours(self, day: Dict[str, Any]) -> float:
+        minutes = 0
+        for session in day.get('sessions', []):
+            block = parse_time_range(session.get('time'))
+            if session.get('type') == 'work':
+                minutes += block[1] - block[0] if block else 60
+        return round(minutes / 60, 2)
+    
+    def _remove_session(self, day: Dict[str, Any], session: Dict[str, Any], diff: List[Dict[str, Any]]):
+        """Drop a work block and the break that directly follows it"""
+        sessions = day['sessions']
+        index = sessions.index(session)
+        removed = [sessions.pop(index)]
+        if index < len(sessions) and sessions[index].get('type') == 'break':
+            removed.append(sessions.pop(index))
+        for item in removed:
+            diff.append({"op": "remove", "date": day['date'], "session": item})
+    
+    def _place_session(
+        self,
+        days: List[Dict[str, Any]],
+        session: Dict[str, Any],
+        after_date: str,
+        due_date: str,
+        preferences: Dict[str, Any],
+        diff: List[Dict[str, Any]],
+        timeline: ScheduleTimeline
+    ) -> bool:
+        """Append a work block to the earliest day with spare capacity"""
+        block = parse_time_range(session.get('time'))
+        length = block[1] - block[0] if block else 60
+        limit = preferences['daily_study_hours'] * 60
+        
+        for day in days:
+            date = day.get('date', '')
+            if (after_date and date <= after_date) or (due_date and date > due_date):
+                continue
+            if self._work_hours(day) * 60 + length > limit:
+                continue
+            if self._append_block(day, session, length, preferences, diff, timeline):
+                return True
+        
+        if due_date is None and days:
+            # No room in the current horizon: open a new day after the last one
+            last = datetime.strptime(days[-1]['date'], '%Y-%m-%d') + timedelta(days=1)
+            day = {"day": last.strftime("%A"), "date": last.strftime("%Y-%m-%d"), "sessions": [], "total_hours": 0}
+            days.append(day)
+            diff.append({"op": "add_day", "date": day['date']})
+            return self._append_block(day, session, length, preferences, diff, timeline)
+        return False
+    
+    def _append_block(
+        self,
+        day: Dict[str, Any],
+        session: Dict[str, Any],
+        length: int,
+        preferences: Dict[str, Any],
+        diff: List[Dict[str, Any]],
+        timeline: ScheduleTimeline
+    ) -> bool:
+        """Place the block after the day's last session, clear of commitments, keeping other blocks untouched"""
+        day.setdefault('sessions', [])
+        busy = DayTimeline()
+        busy.commitments = timeline.day(day['date']).commitments
+        ends = []
+        for existing in day['sessions']:
+            block = session_range(existing)
+            if block:
+                busy.occupy(*block)
+                ends.append(block[1])
+        earliest = max(ends) if ends else _require_clock(preferences['preferred_start_time'], 'preferred_start_time')
+        lead = preferences['break_duration'] if day['sessions'] and day['sessions'][-1].get('type') == 'work' else 0
+        start = busy.first_free(lead + length, earliest)
+        if start is None:
+            return False
+        added = []
+        if lead:
+            added.append({"time": format_time_range(start, start + lead), "type": "break", "activity": "rest"})
+            start += lead
+        moved = dict(session, time=format_time_range(start, start + length))
+        added.append(moved)
+        for item in added:
+            day['sessions'].append(item)
+            diff.append({"op": "add", "date": day['date'], "session": item})
+        return True
     
+    @profiled("agent.schedule_optimizer.communicate_with_wellness")
     async def communicate_with_wellness(self, schedule: Dict[str, Any]) -> Dict[str, Any]:
         """
         Prepare schedule data to send to Wellness Monitor Agent
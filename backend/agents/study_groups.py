@@ -0,0 +1,265 @@
+"""
+Study Group Index
+Indexes many students' free time and courses for group slot search and partner matching
+"""
+
+import heapq
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from agents.timeline import ScheduleTimeline, format_time_range, parse_clock, range_mask
+
+
+def _normalize_course(course: str) -> str:
+    return " ".join(str(course).lower().split())
+
+
+class StudyGroupIndex:
+    """
+    Free-time and course postings over registered students
+
+    Each student's availability is a bitmask per date, one bit per
+    `slot_minutes` slot inside [day_start, day_end), derived from their
+    schedule and commitments. Students get a dense index so that each course maps
+    to a bitset of its students; partner queries only score
+    students sharing a course with the requester, and group queries only touch
+    the group's own masks, so neither scans the whole population.
+    """
+
+    def __init__(self, slot_minutes: int = 30, day_start: int = 8 * 60, day_end: int = 22 * 60):
+        self.slot_minutes = max(5, slot_minutes)
+        self.day_start = day_start
+        self.day_end = max(day_start + self.slot_minutes, day_end)
+        self.slots_per_day = (self.day_end - self.day_start) // self.slot_minutes
+        self._ids: List[Optional[str]] = []
+        self._index: Dict[str, int] = {}
+        self._reusable: List[int] = []
+        self._profiles: Dict[int, Dict[str, Any]] = {}
+        self._free: Dict[int, Dict[str, int]] = {}
+        self._course_members: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _slot_mask(self, free_minutes: int) -> int:
+        """Collapse a 1440-bit free-minute bitmap into whole free slots"""
+        mask = 0
+        slot_bits = range_mask(0, self.slot_minutes)
+        for slot in range(self.slots_per_day):
+            start = self.day_start + slot * self.slot_minutes
+            if (free_minutes >> start) & slot_bits == slot_bits:
+                mask |= 1 << slot
+        return mask
+
+    def _slot_runs(self, mask: int, min_slots: int) -> List[str]:
+        runs = []
+        while mask:
+            start = (mask & -mask).bit_length() - 1
+            run = mask >> start
+            length = (run ^ (run + 1)).bit_length() - 1
+            if length >= min_slots:
+                runs.append(format_time_range(
+                    self.day_start + start * self.slot_minutes,
+                    self.day_start + (start + length) * self.slot_minutes
+                ))
+            mask &= ~range_mask(start, start + length)
+        return runs
+
+    def register(
+        self,
+        student_id: str,
+        courses: Iterable[str],
+        daily_schedules: List[Dict[str, Any]],
+        commitments: List[Dict[str, Any]] = None,
+        name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Add or replace a student's courses and availability
+
+        Args:
+            student_id: Student identifier
+            courses: Courses the student wants partners for
+            daily_schedules: A schedule's daily_schedules; only its dates count as known availability
+            commitments: Optional fixed events (from parse_ics) that are also busy time
+            name: Optional display name returned in matches
+
+        Returns:
+            The student's indexed profile
+        """
+        self.remove(student_id)
+        idx = self._reusable.pop() if self._reusable else len(self._ids)
+        if idx == len(self._ids):
+            self._ids.append(student_id)
+        else:
+            self._ids[idx] = student_id
+        self._index[student_id] = idx
+        bit = 1 << idx
+
+        timeline = ScheduleTimeline()
+        timeline.add_commitments(commitments or [])
+        # Sessions with malformed times are skipped rather than blocking registration
+        timeline.validate(daily_schedules)
+        window = range_mask(self.day_start, self.day_end)
+        free = {}
+        for day in daily_schedules:
+            date = day.get('date')
+            if not date:
+                continue
+            free[date] = self._slot_mask(~timeline.day(date).busy & window)
+        self._free[idx] = free
+
+        course_set = sorted({_normalize_course(c) for c in courses if c})
+        for course in course_set:
+            self._course_members[course] = self._course_members.get(course, 0) | bit
+        self._profiles[idx] = {"student_id": student_id, "name": name, "courses": course_set}
+        return self.profile(student_id)
+
+    def remove(self, student_id: str) -> bool:
+        idx = self._index.pop(student_id, None)
+        if idx is None:
+            return False
+        keep = ~(1 << idx)
+        for course in self._profiles.pop(idx)['courses']:
+            members = self._course_members[course] & keep
+            if members:
+                self._course_members[course] = members
+            else:
+                del self._course_members[course]
+        del self._free[idx]
+        self._ids[idx] = None
+        self._reusable.append(idx)
+        return True
+
+    def profile(self, student_id: str) -> Optional[Dict[str, Any]]:
+        idx = self._index.get(student_id)
+        if idx is None:
+            return None
+        free = self._free[idx]
+        return {
+            **self._profiles[idx],
+            "free_minutes": sum(m.bit_count() for m in free.values()) * self.slot_minutes,
+            "dates": sorted(free),
+        }
+
+    def _require(self, student_id: str) -> int:
+        idx = self._index.get(student_id)
+        if idx is None:
+            raise KeyError(f"Student {student_id} is not registered for study groups")
+        return idx
+
+    def common_free_slots(
+        self,
+        student_ids: List[str],
+        min_minutes: int = 60,
+        dates: Optional[List[str]] = None
+    ) -> Dict[str, List[str]]:
+        """
+        Time blocks of at least `min_minutes` when every student in the group is free
+
+        Raises:
+            KeyError: A student is not registered
+        """
+        members = [self._require(s) for s in dict.fromkeys(student_ids)]
+        if not members:
+            return {}
+        shared_dates = set(self._free[members[0]])
+        for idx in members[1:]:
+            shared_dates &= set(self._free[idx])
+        if dates:
+            shared_dates &= set(dates)
+        min_slots = max(1, -(-min_minutes // self.slot_minutes))
+        slots = {}
+        for date in sorted(shared_dates):
+            mask = range_mask(0, self.slots_per_day)
+            for idx in members:
+                mask &= self._free[idx][date]
+                if not mask:
+                    break
+            runs = self._slot_runs(mask, min_slots)
+            if runs:
+                slots[date] = runs
+        return slots
+
+    def top_partners(
+        self,
+        student_id: str,
+        k: int = 5,
+        course: Optional[str] = None,
+        min_overlap_minutes: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Best study partners by shared courses and overlapping free time
+
+        Only students sharing at least one course (or `course`, if given) are
+        scored. Compatibility is 0-100: half from course overlap, half from
+        the share of the requester's free time the partner is also free.
+
+        Raises:
+            KeyError: The student is not registered
+        """
+        idx = self._require(student_id)
+        mine = self._profiles[idx]['courses']
+        my_free = self._free[idx]
+        my_minutes = sum(m.bit_count() for m in my_free.values()) * self.slot_minutes
+
+        wanted = [_normalize_course(course)] if course else mine
+        candidates = 0
+        for c in wanted:
+            candidates |= self._course_members.get(c, 0)
+        candidates &= ~(1 << idx)
+
+        scored = []
+        while candidates:
+            other = (candidates & -candidates).bit_length() - 1
+            candidates &= candidates - 1
+            their_free = self._free[other]
+            overlap = 0
+            for date, mask in my_free.items():
+                theirs = their_free.get(date)
+                if theirs:
+                    overlap += (mask & theirs).bit_count()
+            overlap_minutes = overlap * self.slot_minutes
+            if overlap_minutes < min_overlap_minutes:
+                continue
+            profile = self._profiles[other]
+            shared = sorted(set(mine) & set(profile['courses']))
+            course_score = len(shared) / len(mine) if mine else 0.0
+            time_score = overlap_minutes / my_minutes if my_minutes else 0.0
+            scored.append((
+                round(50 * course_score + 50 * time_score),
+                overlap_minutes,
+                profile['student_id'],
+                {
+                    "student_id": profile['student_id'],
+                    "name": profile['name'],
+                    "shared_courses": shared,
+                    "overlap_minutes": overlap_minutes,
+                }
+            ))
+
+        top = heapq.nlargest(max(0, k), scored, key=lambda s: (s[0], s[1]))
+        return [{**match, "compatibility": score} for score, _, _, match in top]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "students": len(self._index),
+            "courses": len(self._course_members),
+            "slot_minutes": self.slot_minutes,
+            "day_window": format_time_range(self.day_start, self.day_end),
+        }
+
+
+def _clock_setting(name: str, default: str) -> int:
+    value = os.getenv(name, default)
+    minute = parse_clock(value)
+    if minute is None:
+        raise ValueError(f"{name} must be HH:MM, got {value!r}")
+    return minute
+
+
+# Shared index behind the study-group endpoints
+study_group_index = StudyGroupIndex(
+    slot_minutes=int(os.getenv("STUDY_GROUP_SLOT_MINUTES", 30)),
+    day_start=_clock_setting("STUDY_GROUP_DAY_START", "08:00"),
+    day_end=_clock_setting("STUDY_GROUP_DAY_END", "22:00"),
+)
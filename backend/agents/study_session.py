@@ -0,0 +1,113 @@
+"""
+Study Session Tracker
+Per-connection state for live break management over a study-session channel
+"""
+
+import math
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+DEFAULT_BREAK_THRESHOLDS = (50, 90, 120)
+# Longest plausible stretch a client may report in one tick
+MAX_ELAPSED_MINUTES = 24 * 60
+
+
+def parse_thresholds(raw: str) -> Tuple[int, ...]:
+    """Parse "50,90,120" into ascending minute thresholds"""
+    minutes = []
+    for item in (raw or "").split(","):
+        try:
+            value = int(item)
+        except ValueError:
+            continue
+        if value > 0:
+            minutes.append(value)
+    return tuple(sorted(set(minutes))) or DEFAULT_BREAK_THRESHOLDS
+
+
+class StudySessionTracker:
+    """
+    Tracks minutes worked since the last break for one open session
+
+    The client streams ticks with its elapsed work time; a suggestion is due
+    only when the next threshold is crossed, so most ticks cost nothing.
+    After the last threshold, reminders repeat every `repeat_minutes`. A break
+    (explicit, or the client's timer going backwards) re-arms the thresholds.
+    """
+
+    __slots__ = (
+        "student_id", "thresholds", "repeat_minutes", "activity", "elapsed_minutes",
+        "next_index", "next_repeat", "ticks", "suggestions", "breaks", "started_at"
+    )
+
+    def __init__(self, student_id: Optional[str] = None, thresholds: Tuple[int, ...] = DEFAULT_BREAK_THRESHOLDS, repeat_minutes: int = 30):
+        self.student_id = student_id
+        self.thresholds = thresholds
+        self.repeat_minutes = max(1, repeat_minutes)
+        self.activity = "studying"
+        self.elapsed_minutes = 0.0
+        self.next_index = 0
+        self.next_repeat = None
+        self.ticks = 0
+        self.suggestions = 0
+        self.breaks = 0
+        self.started_at = datetime.now().isoformat()
+
+    def take_break(self):
+        self.elapsed_minutes = 0.0
+        self.next_index = 0
+        self.next_repeat = None
+        self.breaks += 1
+
+    def tick(self, activity: Optional[str], elapsed_minutes: float) -> Optional[int]:
+        """
+        Fold one client tick into the session
+
+        Returns:
+            The threshold (minutes) just crossed, or None if no suggestion is due
+
+        Raises:
+            ValueError: elapsed_minutes is not a finite, non-negative number
+        """
+        if not math.isfinite(elapsed_minutes) or elapsed_minutes < 0:
+            raise ValueError(f"Invalid elapsed_minutes: {elapsed_minutes}")
+        self.ticks += 1
+        if activity:
+            self.activity = activity
+        if elapsed_minutes < self.elapsed_minutes:
+            # Client reset its timer: treat it as a break
+            self.take_break()
+        self.elapsed_minutes = elapsed_minutes
+
+        crossed = None
+        while self.next_index < len(self.thresholds) and elapsed_minutes >= self.thresholds[self.next_index]:
+            crossed = self.thresholds[self.next_index]
+            self.next_index += 1
+        if crossed is not None:
+            if self.next_index == len(self.thresholds):
+                self.next_repeat = crossed + self.repeat_minutes
+            return crossed
+
+        if self.next_repeat is not None and elapsed_minutes >= self.next_repeat:
+            crossed = self.next_repeat
+            # Jump straight past the current time; a loop would spin on huge inputs
+            steps = math.floor((elapsed_minutes - self.next_repeat) / self.repeat_minutes) + 1
+            self.next_repeat += steps * self.repeat_minutes
+            return crossed
+        return None
+
+    def status(self) -> Dict[str, Any]:
+        upcoming: List[int] = list(self.thresholds[self.next_index:])
+        if not upcoming and self.next_repeat is not None:
+            upcoming = [self.next_repeat]
+        return {
+            "student_id": self.student_id,
+            "activity": self.activity,
+            "elapsed_minutes": self.elapsed_minutes,
+            "next_threshold_minutes": upcoming[0] if upcoming else None,
+            "ticks": self.ticks,
+            "suggestions": self.suggestions,
+            "breaks": self.breaks,
+            "started_at": self.started_at,
+        }
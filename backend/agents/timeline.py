@@ -0,0 +1,272 @@
+"""
+Schedule Timeline
+Minute-resolution day bitmaps for conflict checks, free-slot search and ICS commitments
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+MINUTES_PER_DAY = 24 * 60
+
+# Limits on uploaded calendars: one event may span at most this many days, and a
+# document may expand to at most this many per-day busy entries
+MAX_EVENT_DAYS = 31
+MAX_CALENDAR_ENTRIES = 5000
+
+
+def parse_clock(value: str) -> Optional[int]:
+    """Parse "09:30" into 570 minutes after midnight (24:00 allowed), or None if malformed"""
+    try:
+        hours, minutes = value.strip().split(':')
+        minute = int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return None
+    if not 0 <= int(minutes) < 60 or not 0 <= minute <= MINUTES_PER_DAY:
+        return None
+    return minute
+
+
+def parse_time_range(value: str) -> Optional[Tuple[int, int]]:
+    """Parse "09:00-10:30" into (540, 630) minutes, or None if malformed"""
+    try:
+        start, end = value.split('-')
+    except (AttributeError, ValueError):
+        return None
+    start_minute, end_minute = parse_clock(start), parse_clock(end)
+    if start_minute is None or end_minute is None or start_minute >= end_minute:
+        return None
+    return start_minute, end_minute
+
+
+def format_time_range(start: int, end: int) -> str:
+    return f"{start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}"
+
+
+def range_mask(start: int, end: int) -> int:
+    """Bitmap with bits start..end-1 set, e.g. the minutes of a time range"""
+    return ((1 << (end - start)) - 1) << start
+
+
+def session_range(session: Any) -> Optional[Tuple[int, int]]:
+    """Minute range of a schedule session record or wire dict"""
+    start = getattr(session, 'start_minute', None)
+    end = getattr(session, 'end_minute', None)
+    if start is not None and end is not None:
+        return (start, end) if 0 <= start < end <= MINUTES_PER_DAY else None
+    return parse_time_range(session.get('time'))
+
+
+class DayTimeline:
+    """
+    One day as two 1440-bit bitmaps: scheduled sessions and fixed commitments
+
+    Occupancy and conflict checks are a single AND against a range mask;
+    free-slot search walks runs of zero bits instead of individual minutes.
+    """
+
+    __slots__ = ("sessions", "commitments")
+
+    def __init__(self):
+        self.sessions = 0
+        self.commitments = 0
+
+    @property
+    def busy(self) -> int:
+        return self.sessions | self.commitments
+
+    def is_free(self, start: int, end: int) -> bool:
+        return not (self.busy & range_mask(start, end))
+
+    def conflicts_with_commitments(self, start: int, end: int) -> bool:
+        return bool(self.commitments & range_mask(start, end))
+
+    def occupy(self, start: int, end: int):
+        self.sessions |= range_mask(start, end)
+
+    def release(self, start: int, end: int):
+        self.sessions &= ~range_mask(start, end)
+
+    def block(self, start: int, end: int):
+        self.commitments |= range_mask(start, end)
+
+    def free_slots(self, min_minutes: int = 1, earliest: int = 0, latest: int = MINUTES_PER_DAY) -> List[Tuple[int, int]]:
+        """Maximal free (start, end) runs inside [earliest, latest) at least min_minutes long"""
+        if earliest >= latest:
+            return []
+        free = ~self.busy & range_mask(earliest, latest)
+        slots = []
+        while free:
+            start = (free & -free).bit_length() - 1
+            run = free >> start
+            length = (run ^ (run + 1)).bit_length() - 1
+            if length >= min_minutes:
+                slots.append((start, start + length))
+            free &= ~range_mask(start, start + length)
+        return slots
+
+    def first_free(self, length: int, earliest: int = 0, latest: int = MINUTES_PER_DAY) -> Optional[int]:
+        """Earliest start of a free block of `length` minutes, or None"""
+        for start, end in self.free_slots(length, earliest, latest):
+            return start
+        return None
+
+
+class ScheduleTimeline:
+    """Day timelines keyed by ISO date, built from a schedule and optional commitments"""
+
+    def __init__(self):
+        self.days: Dict[str, DayTimeline] = {}
+        self.commitment_events: List[Dict[str, Any]] = []
+
+    def day(self, date: str) -> DayTimeline:
+        timeline = self.days.get(date)
+        if timeline is None:
+            timeline = self.days[date] = DayTimeline()
+        return timeline
+
+    def add_commitments(self, events: Iterable[Dict[str, Any]]):
+        """Block out calendar events ({"date", "start_minute", "end_minute", "summary"})"""
+        for event in events:
+            self.day(event['date']).block(event['start_minute'], event['end_minute'])
+            self.commitment_events.append(event)
+
+    def validate(self, daily_schedules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Load a schedule's sessions, collecting every problem found
+
+        Returns:
+            Issues: malformed times, overlapping sessions, or sessions that
+            collide with a commitment. Empty if the schedule is consistent.
+        """
+        issues = []
+        for day in daily_schedules:
+            date = day.get('date')
+            timeline = self.day(date)
+            for session in day.get('sessions', []):
+                block = session_range(session)
+                if block is None:
+                    issues.append({"issue": "malformed_time", "date": date, "time": session.get('time')})
+                    continue
+                start, end = block
+                if timeline.conflicts_with_commitments(start, end):
+                    issues.append({
+                        "issue": "commitment_conflict",
+                        "date": date,
+                        "time": format_time_range(start, end),
+                        "commitments": [
+                            e['summary'] for e in self.commitment_events
+                            if e['date'] == date and e['start_minute'] < end and start < e['end_minute']
+                        ]
+                    })
+                elif timeline.sessions & range_mask(start, end):
+                    issues.append({"issue": "overlap", "date": date, "time": format_time_range(start, end)})
+                timeline.occupy(start, end)
+        return issues
+
+    def free_slots(
+        self,
+        dates: Iterable[str],
+        min_minutes: int,
+        earliest: int = 0,
+        latest: int = MINUTES_PER_DAY
+    ) -> Dict[str, List[str]]:
+        return {
+            date: [format_time_range(s, e) for s, e in self.day(date).free_slots(min_minutes, earliest, latest)]
+            for date in dates
+        }
+
+
+def _unfold(ics_text: str) -> List[str]:
+    """Join RFC 5545 folded lines (continuations start with a space or tab)"""
+    lines: List[str] = []
+    for raw in ics_text.replace('\r\n', '\n').split('\n'):
+        if raw[:1] in (' ', '\t') and lines:
+            lines[-1] += raw[1:]
+        elif raw:
+            lines.append(raw)
+    return lines
+
+
+def _parse_ics_datetime(value: str) -> Optional[datetime]:
+    """DTSTART/DTEND value as local wall-clock time; None for all-day dates"""
+    value = value.strip()
+    if len(value) == 8:
+        return None
+    utc = value.endswith('Z')
+    parsed = datetime.strptime(value.rstrip('Z')[:15], '%Y%m%dT%H%M%S')
+    if utc:
+        # Convert UTC to the server's local time, naive like the rest of the schedule
+        parsed = parsed.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def _split_by_day(start: datetime, end: datetime, summary: str) -> List[Dict[str, Any]]:
+    """One busy entry per calendar day the range covers"""
+    entries = []
+    cursor = start
+    while cursor < end:
+        next_midnight = datetime.combine(cursor.date() + timedelta(days=1), datetime.min.time())
+        segment_end = min(end, next_midnight)
+        end_minute = MINUTES_PER_DAY if segment_end == next_midnight else segment_end.hour * 60 + segment_end.minute
+        start_minute = cursor.hour * 60 + cursor.minute
+        if end_minute > start_minute:
+            entries.append({
+                "date": cursor.date().isoformat(),
+                "start_minute": start_minute,
+                "end_minute": end_minute,
+                "time": format_time_range(start_minute, end_minute),
+                "summary": summary,
+            })
+        cursor = segment_end
+    return entries
+
+
+def parse_ics(ics_text: str) -> List[Dict[str, Any]]:
+    """
+    Extract timed VEVENTs from an iCalendar document as per-day minute ranges
+
+    Events crossing midnight are split per day. All-day events are skipped
+    (they are usually reminders, not busy time) and RRULE recurrences are not
+    expanded; TZID parameters are treated as local time.
+
+    Raises:
+        ValueError: The text is not an iCalendar document, an event is longer
+            than MAX_EVENT_DAYS or outside the supported date range, or the
+            document expands to more than MAX_CALENDAR_ENTRIES entries
+    """
+    lines = _unfold(ics_text or "")
+    if not lines or lines[0].strip().upper() != "BEGIN:VCALENDAR":
+        raise ValueError("calendar_ics must be an iCalendar (BEGIN:VCALENDAR) document")
+
+    events: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, str]] = None
+    for line in lines:
+        name, _, value = line.partition(':')
+        key = name.split(';', 1)[0].upper()
+        if key == "BEGIN" and value.strip().upper() == "VEVENT":
+            current = {}
+        elif key == "END" and value.strip().upper() == "VEVENT" and current is not None:
+            current, event = None, current
+            try:
+                start = _parse_ics_datetime(event.get('DTSTART', ''))
+                end = _parse_ics_datetime(event['DTEND']) if 'DTEND' in event else None
+            except ValueError:
+                continue
+            except OverflowError:
+                raise ValueError("calendar_ics has an event outside the supported date range")
+            if start is None:
+                continue
+            try:
+                if end is None or end <= start:
+                    end = start + timedelta(hours=1)
+                if end - start > timedelta(days=MAX_EVENT_DAYS):
+                    raise ValueError(f"calendar_ics events may span at most {MAX_EVENT_DAYS} days")
+                events.extend(_split_by_day(start, end, event.get('SUMMARY', 'Busy')))
+            except OverflowError:
+                raise ValueError("calendar_ics has an event outside the supported date range")
+            if len(events) > MAX_CALENDAR_ENTRIES:
+                raise ValueError(f"calendar_ics expands to more than {MAX_CALENDAR_ENTRIES} busy entries")
+        elif current is not None and key in ("DTSTART", "DTEND", "SUMMARY"):
+            current[key] = value
+    return events
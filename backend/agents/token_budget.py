@@ -0,0 +1,163 @@
+"""
+Token Budget
+Per-tenant LLM token accounting and budget enforcement
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class TokenBudgetExceededError(Exception):
+    """Raised instead of calling a model once the tenant's token budget is spent"""
+
+
+def parse_budgets(raw: str) -> Dict[str, int]:
+    """Parse "cs-dept=200000,math-dept=50000" into a tenant budget map"""
+    budgets = {}
+    for item in (raw or "").split(","):
+        if "=" not in item:
+            continue
+        name, value = item.split("=", 1)
+        try:
+            budgets[name.strip()] = int(float(value))
+        except ValueError:
+            continue
+    return budgets
+
+
+def _empty_usage() -> Dict[str, int]:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
+
+def _add_usage(totals: Dict[str, int], prompt_tokens: int, completion_tokens: int):
+    totals['calls'] += 1
+    totals['prompt_tokens'] += prompt_tokens
+    totals['completion_tokens'] += completion_tokens
+    totals['total_tokens'] += prompt_tokens + completion_tokens
+
+
+class TenantUsage:
+    """Lifetime totals plus hourly buckets for the budget window of one tenant"""
+
+    __slots__ = ("totals", "by_agent", "by_model", "hourly", "rejected")
+
+    def __init__(self):
+        self.totals = _empty_usage()
+        self.by_agent: Dict[str, Dict[str, int]] = {}
+        self.by_model: Dict[str, Dict[str, int]] = {}
+        # hour number -> total tokens used in that hour
+        self.hourly: "OrderedDict[int, int]" = OrderedDict()
+        self.rejected = 0
+
+    def window_tokens(self, now_hour: int, window_hours: int) -> int:
+        while self.hourly and next(iter(self.hourly)) <= now_hour - window_hours:
+            self.hourly.popitem(last=False)
+        return sum(self.hourly.values())
+
+
+class TokenLedger:
+    """
+    Records prompt/completion tokens for every LLM call and enforces budgets
+
+    Usage is attributed to the tenant (and, when known, the student) of the
+    request plus the calling agent and model. Budgets are total tokens per
+    tenant over a rolling `window_hours` window, counted in hourly buckets.
+    A tenant over budget gets TokenBudgetExceededError before any model call,
+    which sends the agents down their local heuristic paths until older usage
+    ages out of the window. A budget of 0 means unlimited.
+    """
+
+    def __init__(
+        self,
+        default_budget: int = 0,
+        tenant_budgets: Dict[str, int] = None,
+        window_hours: int = 24,
+        max_students: int = 10000
+    ):
+        self.default_budget = default_budget
+        self.tenant_budgets = tenant_budgets or {}
+        self.window_hours = max(1, window_hours)
+        self.max_students = max_students
+        self._tenants: Dict[str, TenantUsage] = {}
+        self._students: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+
+    def budget_for(self, tenant: str) -> int:
+        return self.tenant_budgets.get(tenant, self.default_budget)
+
+    @staticmethod
+    def _hour() -> int:
+        return int(time.time() // 3600)
+
+    def check(self, tenant: str):
+        """Raise TokenBudgetExceededError if the tenant has no budget left"""
+        budget = self.budget_for(tenant)
+        if not budget:
+            return
+        usage = self._tenants.get(tenant)
+        if usage is None:
+            return
+        used = usage.window_tokens(self._hour(), self.window_hours)
+        if used >= budget:
+            usage.rejected += 1
+            raise TokenBudgetExceededError(
+                f"Token budget exhausted for {tenant}: {used}/{budget} in the last {self.window_hours}h"
+            )
+
+    def record(
+        self,
+        tenant: str,
+        agent: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        student_id: Optional[str] = None
+    ):
+        """Attribute one completed call's token usage"""
+        usage = self._tenants.get(tenant)
+        if usage is None:
+            usage = self._tenants[tenant] = TenantUsage()
+        _add_usage(usage.totals, prompt_tokens, completion_tokens)
+        _add_usage(usage.by_agent.setdefault(agent, _empty_usage()), prompt_tokens, completion_tokens)
+        _add_usage(usage.by_model.setdefault(model, _empty_usage()), prompt_tokens, completion_tokens)
+        hour = self._hour()
+        usage.hourly[hour] = usage.hourly.get(hour, 0) + prompt_tokens + completion_tokens
+
+        if student_id:
+            totals = self._students.get(student_id)
+            if totals is None:
+                totals = self._students[student_id] = _empty_usage()
+                if len(self._students) > self.max_students:
+                    self._students.popitem(last=False)
+            else:
+                self._students.move_to_end(student_id)
+            _add_usage(totals, prompt_tokens, completion_tokens)
+
+    def tenant_summary(self, tenant: str) -> Optional[Dict[str, Any]]:
+        usage = self._tenants.get(tenant)
+        if usage is None:
+            return None
+        budget = self.budget_for(tenant)
+        used = usage.window_tokens(self._hour(), self.window_hours)
+        return {
+            **usage.totals,
+            "window_tokens": used,
+            "budget": budget or None,
+            "remaining": max(0, budget - used) if budget else None,
+            "over_budget": bool(budget) and used >= budget,
+            "rejected_calls": usage.rejected,
+            "by_agent": usage.by_agent,
+            "by_model": usage.by_model,
+        }
+
+    def student_summary(self, student_id: str) -> Optional[Dict[str, int]]:
+        return self._students.get(student_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Aggregates for every tenant seen so far"""
+        return {
+            "window_hours": self.window_hours,
+            "default_budget": self.default_budget or None,
+            "tenants": {tenant: self.tenant_summary(tenant) for tenant in self._tenants},
+            "students_tracked": len(self._students),
+        }
@@ -6,7 +6,42 @@ Monitors student wellness and provides recommendations for breaks and stress man
 import google.generativeai as genai
 from typing import Dict, Any, List
 from datetime import datetime
-import json
+import os
+
+from agents.model_router import (
+    model_router, extract_json, InvalidModelOutput,
+    TASK_WELLNESS_ASSESSMENT, TASK_BREAK_SUGGESTION
+)
+from agents.admission import note_fallback
+from agents.profiler import profiled
+from agents.wellness_trends import WellnessTrendTracker, trend_risk_adjustment
+from agents.records import WellnessAssessment
+from agents.prompt_memo import QuantizedMemo, parse_bins
+from agents.study_session import StudySessionTracker, parse_thresholds
+
+
+def _parse_assessment(text: str) -> WellnessAssessment:
+    data = extract_json(text)
+    if not isinstance(data, dict):
+        raise InvalidModelOutput("assessment is not a JSON object")
+    assessment = WellnessAssessment.from_llm(data)
+    if assessment.wellness_score is None or not 0 <= assessment.wellness_score <= 100:
+        raise InvalidModelOutput("wellness_score missing or outside 0-100")
+    if not isinstance(assessment.risk_level, str):
+        raise InvalidModelOutput("risk_level missing")
+    return assessment
+
+
+def _parse_break_suggestion(text: str) -> Dict[str, Any]:
+    suggestion = extract_json(text)
+    if not isinstance(suggestion, dict):
+        raise InvalidModelOutput("break suggestion is not a JSON object")
+    duration = suggestion.get('duration_minutes')
+    if isinstance(duration, bool) or not isinstance(duration, (int, float)) or duration <= 0:
+        raise InvalidModelOutput("duration_minutes missing or not positive")
+    if not isinstance(suggestion.get('activity'), str):
+        raise InvalidModelOutput("activity missing")
+    return suggestion
 
 
 class WellnessMonitorAgent:
@@ -14,15 +49,27 @@ class WellnessMonitorAgent:
     
     def __init__(self, api_key: str):
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
         self.name = "Wellness Monitor"
+        self.trends = WellnessTrendTracker(
+            window=int(os.getenv("WELLNESS_TREND_WINDOW", 7)),
+            alpha=float(os.getenv("WELLNESS_TREND_ALPHA", 0.3))
+        )
+        self.assessment_memo = QuantizedMemo(
+            bins=parse_bins(os.getenv("PROMPT_MEMO_BINS", "")),
+            ttl_seconds=float(os.getenv("PROMPT_MEMO_TTL_SECONDS", 3600)),
+            max_entries=int(os.getenv("PROMPT_MEMO_SIZE", 1000))
+        )
+        self.break_thresholds = parse_thresholds(os.getenv("BREAK_THRESHOLDS_MINUTES", ""))
+        self.break_repeat_minutes = int(os.getenv("BREAK_REPEAT_MINUTES", 30))
         
+    @profiled("agent.wellness_monitor.assess_wellness")
     async def assess_wellness(
         self,
         workload_data: Dict[str, Any],
         schedule_data: Dict[str, Any],
-        student_input: Dict[str, Any] = None
-    ) -> Dict[str, Any]:
+        student_input: Dict[str, Any] = None,
+        student_id: str = None
+    ) -> WellnessAssessment:
         """
         Assess student wellness based on workload and schedule
         
@@ -30,10 +77,15 @@ class WellnessMonitorAgent:
             workload_data: From Assignment Analyzer
             schedule_data: From Schedule Optimizer
             student_input: Optional self-reported mood, stress, sleep
+            student_id: Optional student id; scores against the student's check-in trends
             
         Returns:
             Wellness assessment with recommendations
         """
+        # Trends only move on explicit check-ins (record_checkin), so retried or
+        # repeated assessments don't inflate streaks and averages
+        trend = self.trends.get(student_id) if student_id else None
+        
         if student_input is None:
             student_input = {
                 "mood": "neutral",
@@ -46,21 +98,41 @@ class WellnessMonitorAgent:
         stress_level = workload_data.get('stress_level', 'Medium')
         total_hours = workload_data.get('total_estimated_hours', 0)
         avg_daily_hours = schedule_data.get('metrics', {}).get('average_daily_hours', 0)
+        mood = str(student_input.get('mood', 'neutral')).strip().lower()
+        
+        # Assessments are shared by every student whose inputs fall in the same bins
+        memo = self.assessment_memo
+        memo_key = memo.key(
+            stress_level=stress_level,
+            total_hours=total_hours,
+            daily_hours=avg_daily_hours,
+            mood=mood,
+            stress=student_input.get('stress_level', 5),
+            sleep=student_input.get('sleep_hours', 7),
+            energy=student_input.get('energy_level', 5),
+            trend=self._trend_signature(trend)
+        )
+        cached = memo.get(memo_key)
+        if cached is not None:
+            assessment = cached.copy()
+            assessment.assessed_at = datetime.now().isoformat()
+            assessment.trends = trend
+            return assessment
         
         prompt = f"""
 You are a wellness and mental health advisor for students. Assess the student's wellness.
 
 WORKLOAD METRICS:
 - Stress level: {stress_level}
-- Total work hours this week: {total_hours}
-- Average daily study hours: {avg_daily_hours}
+- Total work hours this week: {memo.describe('total_hours', total_hours)}
+- Average daily study hours: {memo.describe('daily_hours', avg_daily_hours)}
 
 STUDENT SELF-REPORT:
-- Mood: {student_input.get('mood', 'neutral')}
-- Stress level (1-10): {student_input.get('stress_level', 5)}
-- Sleep hours: {student_input.get('sleep_hours', 7)}
-- Energy level (1-10): {student_input.get('energy_level', 5)}
-
+- Mood: {mood}
+- Stress level (1-10): {memo.describe('stress', student_input.get('stress_level', 5))}
+- Sleep hours: {memo.describe('sleep', student_input.get('sleep_hours', 7))}
+- Energy level (1-10): {memo.describe('energy', student_input.get('energy_level', 5))}
+{self._format_trends(trend, coarse=memo.enabled)}
 Provide a wellness assessment with:
 1. Overall wellness score (1-100)
 2. Risk factors identified
@@ -87,29 +159,81 @@ Return as JSON:
 """
         
         try:
-            response = self.model.generate_content(prompt)
-            text = response.text.strip()
-            if text.startswith('```json'):
-                text = text[7:]
-            if text.endswith('```'):
-                text = text[:-3]
-            
-            assessment = json.loads(text.strip())
-            assessment['assessed_at'] = datetime.now().isoformat()
-            assessment['assessed_by'] = self.name
+            assessment = await model_router.generate(
+                TASK_WELLNESS_ASSESSMENT, prompt, _parse_assessment, agent=self.name
+            )
+            assessment.assessed_at = datetime.now().isoformat()
+            assessment.assessed_by = self.name
+            memo.put(memo_key, assessment.copy())
+            assessment.trends = trend
             
             return assessment
             
         except Exception as e:
             print(f"Error assessing wellness: {e}")
-            return self._create_basic_assessment(stress_level, avg_daily_hours, student_input)
+            note_fallback(self.name)
+            return self._create_basic_assessment(stress_level, avg_daily_hours, student_input, trend)
+    
+    @staticmethod
+    def _trend_signature(trend: Dict[str, Any]):
+        """Coarse trend state used in the memo key: directions plus 3+ check-in streaks"""
+        if not trend or trend['checkins'] < 2:
+            return None
+        return (
+            tuple(trend['trends'][m] for m in ("stress_level", "sleep_hours", "energy_level")),
+            tuple(trend['streaks'][k] >= 3 for k in ("poor_sleep", "high_stress", "low_energy"))
+        )
+    
+    @staticmethod
+    def _format_trends(trend: Dict[str, Any], coarse: bool = False) -> str:
+        """Render the rolling trend state as an extra prompt section"""
+        if not trend or trend['checkins'] < 2:
+            return ""
+        means, streaks = trend['window_means'], trend['streaks']
+        if coarse:
+            # Only what the memo key captures, so a shared assessment fits every student in the bin
+            ongoing = [k.replace('_', ' ') for k in ("poor_sleep", "high_stress", "low_energy") if streaks[k] >= 3]
+            return f"""
+RECENT TRENDS:
+- Stress {trend['trends']['stress_level']}, sleep {trend['trends']['sleep_hours']}, energy {trend['trends']['energy_level']}
+- Streaks of 3+ check-ins: {', '.join(ongoing) or 'none'}
+"""
+        return f"""
+RECENT TRENDS (last {trend['window_size']} check-ins):
+- Average stress: {means['stress_level']}, sleep: {means['sleep_hours']}h, energy: {means['energy_level']}
+- Stress {trend['trends']['stress_level']}, sleep {trend['trends']['sleep_hours']}, energy {trend['trends']['energy_level']}
+- Streaks: poor sleep {streaks['poor_sleep']}, high stress {streaks['high_stress']}, low energy {streaks['low_energy']}
+"""
+    
+    @profiled("agent.wellness_monitor.record_checkin")
+    async def record_checkin(self, student_id: str, student_input: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fold a wellness self-report into the student's rolling trends (no LLM call)
+        
+        Args:
+            student_id: Student identifier
+            student_input: Self-reported mood, stress, sleep, energy
+            
+        Returns:
+            Trend snapshot with the trend-based score adjustment and risk factors
+        """
+        trend = self.trends.record(student_id, student_input)
+        adjustment, factors = trend_risk_adjustment(trend)
+        return {
+            "student_id": student_id,
+            "trends": trend,
+            "score_adjustment": adjustment,
+            "trend_risk_factors": factors,
+            "recorded_at": datetime.now().isoformat()
+        }
     
     def _create_basic_assessment(
         self,
         stress_level: str,
         avg_daily_hours: float,
-        student_input: Dict[str, Any]
-    ) -> Dict[str, Any]:
+        student_input: Dict[str, Any],
+        trend: Dict[str, Any] = None
+    ) -> WellnessAssessment:
         """Create a basic wellness assessment"""
         
         # Calculate wellness score
@@ -127,6 +251,9 @@ Return as JSON:
         if student_input.get('sleep_hours', 7) < 6:
             base_score -= 15
         
+        trend_adjustment, trend_factors = trend_risk_adjustment(trend)
+        base_score += trend_adjustment
+        
         wellness_score = max(10, min(100, base_score))
         
         # Determine risk level
@@ -137,14 +264,14 @@ Return as JSON:
         else:
             risk_level = "Low"
         
-        return {
-            "wellness_score": wellness_score,
-            "risk_level": risk_level,
-            "risk_factors": [
+        return WellnessAssessment(
+            wellness_score=wellness_score,
+            risk_level=risk_level,
+            risk_factors=[
                 f"Stress level: {stress_level}",
                 f"Study hours: {avg_daily_hours:.1f}/day"
-            ],
-            "recommendations": [
+            ] + trend_factors,
+            recommendations=[
                 {
                     "category": "breaks",
                     "suggestion": "Take a 10-minute break every hour",
@@ -161,18 +288,20 @@ Return as JSON:
                     "frequency": "daily"
                 }
             ],
-            "wellness_activities": [
+            wellness_activities=[
                 "Deep breathing exercises",
                 "Short meditation session",
                 "Stretching routine",
                 "Social connection time"
             ],
-            "alert_threshold": "If stress remains high for more than a week, consider counseling",
-            "positive_aspects": ["You're tracking your wellness", "You're being proactive"],
-            "assessed_at": datetime.now().isoformat(),
-            "assessed_by": self.name
-        }
+            alert_threshold="If stress remains high for more than a week, consider counseling",
+            positive_aspects=["You're tracking your wellness", "You're being proactive"],
+            assessed_at=datetime.now().isoformat(),
+            assessed_by=self.name,
+            trends=trend
+        )
     
+    @profiled("agent.wellness_monitor.suggest_break")
     async def suggest_break(self, current_activity: str, time_worked: int) -> Dict[str, Any]:
         """
         Suggest an appropriate break activity
@@ -203,20 +332,16 @@ Return as JSON:
 """
         
         try:
-            response = self.model.generate_content(prompt)
-            text = response.text.strip()
-            if text.startswith('```json'):
-                text = text[7:]
-            if text.endswith('```'):
-                text = text[:-3]
-            
-            suggestion = json.loads(text.strip())
+            suggestion = await model_router.generate(
+                TASK_BREAK_SUGGESTION, prompt, _parse_break_suggestion, agent=self.name
+            )
             suggestion['suggested_at'] = datetime.now().isoformat()
             
             return suggestion
             
         except Exception as e:
             print(f"Error suggesting break: {e}")
+            note_fallback(self.name)
             return {
                 "duration_minutes": 10,
                 "activity": "Take a short walk or stretch",
@@ -225,6 +350,39 @@ Return as JSON:
                 "suggested_at": datetime.now().isoformat()
             }
     
+    def start_study_session(self, student_id: str = None) -> StudySessionTracker:
+        """Open break tracking for one live study session"""
+        return StudySessionTracker(student_id, self.break_thresholds, self.break_repeat_minutes)
+    
+    async def study_session_tick(
+        self,
+        session: StudySessionTracker,
+        current_activity: str,
+        elapsed_minutes: float
+    ) -> Dict[str, Any]:
+        """
+        Process one activity/elapsed-time tick from a live study session
+        
+        Args:
+            session: Tracker from start_study_session
+            current_activity: What the student is currently doing
+            elapsed_minutes: Minutes worked since the last break
+            
+        Returns:
+            Break suggestion if a threshold was crossed, otherwise None
+        """
+        threshold = session.tick(current_activity, elapsed_minutes)
+        if threshold is None:
+            return None
+        suggestion = await self.suggest_break(session.activity, int(session.elapsed_minutes))
+        session.suggestions += 1
+        return {
+            "threshold_minutes": threshold,
+            "elapsed_minutes": session.elapsed_minutes,
+            "suggestion": suggestion
+        }
+    
+    @profiled("agent.wellness_monitor.communicate_with_agents")
     async def communicate_with_agents(self, wellness_assessment: Dict[str, Any]) -> Dict[str, Any]:
         """
         Prepare wellness data to send back to other agents
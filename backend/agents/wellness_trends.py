@@ -0,0 +1,153 @@
+"""
+Wellness Trends
+Incrementally maintained rolling wellness statistics per student
+"""
+
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+METRICS = ("stress_level", "sleep_hours", "energy_level")
+_DEFAULTS = (5.0, 7.0, 5.0)
+_TREND_DELTA = (0.5, 0.5, 0.5)
+
+
+class RollingWellnessState:
+    """
+    Fixed-size rolling state for one student, updated in O(1) per check-in
+
+    The last `window` values of each metric live in one flat ring buffer;
+    running sums give windowed means without rescanning history.
+    """
+
+    __slots__ = ("window", "values", "head", "count", "sums", "ewma", "streaks", "checkins", "updated_at")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = array('d', [0.0]) * (window * len(METRICS))
+        self.head = 0
+        self.count = 0
+        self.sums = array('d', [0.0]) * len(METRICS)
+        self.ewma = array('d', [0.0]) * len(METRICS)
+        # poor sleep, high stress, low energy
+        self.streaks = array('H', [0]) * 3
+        self.checkins = 0
+        self.updated_at = None
+
+    def update(self, sample: Tuple[float, float, float], alpha: float):
+        slot = self.head * len(METRICS)
+        full = self.count == self.window
+        for i, value in enumerate(sample):
+            if full:
+                self.sums[i] -= self.values[slot + i]
+            self.values[slot + i] = value
+            self.sums[i] += value
+            self.ewma[i] = value if self.checkins == 0 else alpha * value + (1 - alpha) * self.ewma[i]
+        self.head = (self.head + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+        self.checkins += 1
+        self.updated_at = datetime.now().isoformat()
+
+        stress, sleep, energy = sample
+        for i, hit in enumerate((sleep < 6, stress >= 7, energy <= 3)):
+            self.streaks[i] = min(self.streaks[i] + 1, 65535) if hit else 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        means = [self.sums[i] / self.count if self.count else 0.0 for i in range(len(METRICS))]
+        trends = {}
+        for i, metric in enumerate(METRICS):
+            # Recent (EWMA) level against the window average
+            delta = self.ewma[i] - means[i]
+            if self.count < 3 or abs(delta) < _TREND_DELTA[i]:
+                trends[metric] = "stable"
+            else:
+                trends[metric] = "rising" if delta > 0 else "falling"
+        return {
+            "checkins": self.checkins,
+            "window_size": self.count,
+            "window_means": {m: round(means[i], 2) for i, m in enumerate(METRICS)},
+            "ewma": {m: round(self.ewma[i], 2) for i, m in enumerate(METRICS)},
+            "trends": trends,
+            "streaks": {
+                "poor_sleep": self.streaks[0],
+                "high_stress": self.streaks[1],
+                "low_energy": self.streaks[2],
+            },
+            "updated_at": self.updated_at,
+        }
+
+
+class WellnessTrendTracker:
+    """Per-student rolling wellness state with a bounded number of students"""
+
+    def __init__(self, window: int = 7, alpha: float = 0.3, max_students: int = 100000):
+        self.window = max(1, window)
+        self.alpha = alpha
+        self.max_students = max_students
+        self._states: "OrderedDict[str, RollingWellnessState]" = OrderedDict()
+
+    def record(self, student_id: str, student_input: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fold one self-report into the student's rolling state
+
+        Args:
+            student_id: Student identifier
+            student_input: Self-report with stress_level, sleep_hours, energy_level
+
+        Returns:
+            Updated trend snapshot
+        """
+        state = self._states.get(student_id)
+        if state is None:
+            state = self._states[student_id] = RollingWellnessState(self.window)
+            if len(self._states) > self.max_students:
+                self._states.popitem(last=False)
+        else:
+            self._states.move_to_end(student_id)
+
+        sample = tuple(
+            float(student_input.get(metric) if student_input.get(metric) is not None else default)
+            for metric, default in zip(METRICS, _DEFAULTS)
+        )
+        state.update(sample, self.alpha)
+        return state.snapshot()
+
+    def get(self, student_id: str) -> Optional[Dict[str, Any]]:
+        """Current trend snapshot for a student, or None if never seen"""
+        state = self._states.get(student_id)
+        return state.snapshot() if state else None
+
+
+def trend_risk_adjustment(snapshot: Optional[Dict[str, Any]]) -> Tuple[int, List[str]]:
+    """
+    Wellness score adjustment and risk factors implied by recent trends
+
+    Args:
+        snapshot: Output of WellnessTrendTracker.record/get
+
+    Returns:
+        (score delta, list of trend risk factors)
+    """
+    if not snapshot:
+        return 0, []
+
+    delta, factors = 0, []
+    streaks, trends = snapshot['streaks'], snapshot['trends']
+    if streaks['poor_sleep'] >= 3:
+        delta -= 10
+        factors.append(f"Under 6h sleep for {streaks['poor_sleep']} check-ins in a row")
+    if streaks['high_stress'] >= 3:
+        delta -= 10
+        factors.append(f"High stress for {streaks['high_stress']} check-ins in a row")
+    if streaks['low_energy'] >= 3:
+        delta -= 5
+        factors.append(f"Low energy for {streaks['low_energy']} check-ins in a row")
+    if trends['sleep_hours'] == "falling":
+        delta -= 5
+        factors.append("Sleep is declining")
+    if trends['stress_level'] == "rising":
+        delta -= 5
+        factors.append("Stress is rising")
+    return delta, factors
@@ -0,0 +1,210 @@
+"""
+ASCA Job Manager
+Runs long multi-agent workflows in the background behind a job id
+"""
+
+import asyncio
+import json
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from agents.admission import current_fallbacks
+from agents.llm_scheduler import (
+    llm_request_context, current_priority, current_tenant, current_student,
+    PRIORITY_BACKGROUND, PRIORITY_BULK
+)
+from agents.records import wire_default
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+
+class JobQueueFullError(Exception):
+    """Raised by submit while `max_pending` jobs are already queued or running"""
+
+
+class JobManager:
+    """
+    Submits workflows as asyncio tasks and tracks their lifecycle
+
+    At most `max_concurrent` jobs run at once; the rest wait in `queued`, and
+    once `max_pending` jobs are queued or running new submissions are refused.
+    Finished jobs are kept (oldest evicted first) up to `max_jobs`. Their LLM
+    calls run at background priority (bulk if submitted as bulk) under the
+    submitter's tenant, so deferred work never competes with live requests.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        max_pending: int = 100,
+        max_jobs: int = 1000,
+        callback_hosts: Iterable[str] = ("localhost", "127.0.0.1")
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_pending = max(1, max_pending)
+        self.max_jobs = max_jobs
+        self.callback_hosts = set(callback_hosts)
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def validate_callback(self, callback_url: Optional[str]):
+        """Raise ValueError unless the callback URL targets an allowed host"""
+        if not callback_url:
+            return
+        parsed = urlparse(callback_url)
+        if parsed.scheme not in ("http", "https") or parsed.hostname not in self.callback_hosts:
+            raise ValueError(f"callback_url must be http(s) on one of: {', '.join(sorted(self.callback_hosts))}")
+
+    def submit(
+        self,
+        kind: str,
+        workflow: Callable[[], Awaitable[Dict[str, Any]]],
+        callback_url: str = None
+    ) -> Dict[str, Any]:
+        """
+        Enqueue a workflow and return immediately
+
+        Args:
+            kind: Workflow name, e.g. "full-analysis"
+            workflow: Zero-argument coroutine function producing the result
+            callback_url: Optional URL to POST the finished job to
+
+        Returns:
+            Public view of the new job
+
+        Raises:
+            ValueError: The callback URL is not allowed
+            JobQueueFullError: `max_pending` jobs are already queued or running
+        """
+        self.validate_callback(callback_url)
+        if self.pending() >= self.max_pending:
+            raise JobQueueFullError(f"{self.max_pending} jobs are already queued or running")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "kind": kind,
+            "status": JOB_QUEUED,
+            "submitted_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "result": None,
+            "callback_url": callback_url,
+            "callback_status": None,
+        }
+        self._jobs[job_id] = job
+        priority = PRIORITY_BULK if current_priority.get() == PRIORITY_BULK else PRIORITY_BACKGROUND
+        task = asyncio.get_running_loop().create_task(
+            self._run(job, workflow, priority, current_tenant.get(), current_student.get())
+        )
+        task.add_done_callback(lambda _: self._finished(job))
+        self._tasks[job_id] = task
+        self._evict()
+        return self.view(job)
+
+    async def _run(
+        self,
+        job: Dict[str, Any],
+        workflow: Callable[[], Awaitable[Dict[str, Any]]],
+        priority: str,
+        tenant: str,
+        student: Optional[str]
+    ):
+        try:
+            async with self._slots:
+                job['status'] = JOB_RUNNING
+                job['started_at'] = datetime.now().isoformat()
+                # Fallbacks are tracked per job, not on the request that submitted it
+                fallbacks = set()
+                current_fallbacks.set(fallbacks)
+                with llm_request_context(priority, tenant, student):
+                    job['result'] = await workflow()
+                if fallbacks and isinstance(job['result'], dict):
+                    job['result']['degraded'] = True
+                job['status'] = JOB_SUCCEEDED
+        except asyncio.CancelledError:
+            job['status'] = JOB_CANCELLED
+        except Exception as e:
+            job['status'] = JOB_FAILED
+            job['error'] = str(e)
+        finally:
+            job['finished_at'] = datetime.now().isoformat()
+            self._tasks.pop(job['job_id'], None)
+
+        if job['callback_url']:
+            await self._send_callback(job)
+
+    async def _send_callback(self, job: Dict[str, Any]):
+        payload = json.dumps(dict(self.view(job), result=job['result']), default=wire_default)
+        try:
+            async with httpx.AsyncClient(timeout=10) as client:
+                response = await client.post(
+                    job['callback_url'],
+                    content=payload,
+                    headers={"Content-Type": "application/json"}
+                )
+            job['callback_status'] = response.status_code
+        except httpx.HTTPError as e:
+            print(f"Error delivering job callback for {job['job_id']}: {e}")
+            job['callback_status'] = "error"
+
+    def _finished(self, job: Dict[str, Any]):
+        """Task done; covers jobs cancelled while queued, before _run ever started"""
+        self._tasks.pop(job['job_id'], None)
+        if job['status'] not in FINISHED_STATES:
+            job['status'] = JOB_CANCELLED
+            job['finished_at'] = datetime.now().isoformat()
+
+    def pending(self) -> int:
+        """Jobs queued or running"""
+        return len(self._tasks)
+
+    def _evict(self):
+        """Drop the oldest finished jobs beyond the retention limit"""
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        for job_id in [j for j, job in self._jobs.items() if job['status'] in FINISHED_STATES][:excess]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job
+
+        Returns:
+            True if a cancellation was requested, False if already finished
+        """
+        task = self._tasks.get(job_id)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    @staticmethod
+    def view(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Job metadata without the (possibly large) result"""
+        return {k: v for k, v in job.items() if k != 'result'}
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {state: 0 for state in (JOB_QUEUED, JOB_RUNNING) + FINISHED_STATES}
+        for job in self._jobs.values():
+            counts[job['status']] += 1
+        return {"max_concurrent": self.max_concurrent, "max_pending": self.max_pending, "jobs": counts}
@@ -3,19 +3,37 @@ ASCA Multi-Agent System - FastAPI Server
 Orchestrates communication between Assignment Analyzer, Schedule Optimizer, and Wellness Monitor agents
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Header, Body, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+import asyncio
+import hmac
+import json
+import math
 import os
 from dotenv import load_dotenv
 
+# Load environment variables before agent modules read their settings
+load_dotenv()
+
 from agents.assignment_analyzer import AssignmentAnalyzerAgent
 from agents.schedule_optimizer import ScheduleOptimizerAgent
 from agents.wellness_monitor import WellnessMonitorAgent
-
-# Load environment variables
-load_dotenv()
+from agents.llm_scheduler import llm_scheduler, llm_request_context, current_priority, PRIORITY_INTERACTIVE
+from agents.llm_client import llm_client
+from agents.admission import admission_controller, current_degraded, current_fallbacks, served_fallback, ADMIT, REJECT
+from agents.model_router import model_router
+from agents.records import wire_default
+from agents.timeline import parse_ics
+from agents.study_session import MAX_ELAPSED_MINUTES
+from agents.study_groups import study_group_index
+from agents.profiler import request_profiler, profiled, span
+import result_store
+from response_cache import ResponseCache, etag_matches, request_hash
+from result_store import ResultStore
+from jobs import JobManager, JobQueueFullError, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED
 
 app = FastAPI(
     title="ASCA Multi-Agent System",
@@ -23,15 +41,115 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# CORS middleware for frontend
+# Endpoints that call the LLM; only these are subject to admission control
+LLM_PATHS = {
+    "/api/analyze-assignment",
+    "/api/analyze-workload",
+    "/api/create-schedule",
+    "/api/wellness-check",
+    "/api/full-analysis",
+    "/api/suggest-break",
+}
+# Endpoints that enqueue deferred LLM work; rejected rather than degraded when overloaded
+BULK_LLM_PATHS = {"/api/jobs/full-analysis"}
+
+
+@app.middleware("http")
+async def admission_middleware(request: Request, call_next):
+    """Serve degraded or reject LLM-backed requests while in-flight work or the LLM queue is over limits"""
+    path = request.url.path
+    bulk = path in BULK_LLM_PATHS
+    if request.method != "POST" or not (bulk or path in LLM_PATHS):
+        return await call_next(request)
+
+    decision = admission_controller.decide(
+        current_priority.get(), llm_scheduler.queue_depth(), bulk=bulk, job_backlog=jobs.pending()
+    )
+    if decision == REJECT:
+        retry_after = admission_controller.retry_after_seconds
+        return JSONResponse(
+            {"detail": "Server is overloaded, retry later", "retry_after": retry_after},
+            status_code=503,
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    token = current_degraded.set(decision != ADMIT)
+    fallbacks = set()
+    fallbacks_token = current_fallbacks.set(fallbacks)
+    admission_controller.enter()
+    try:
+        response = await call_next(request)
+    finally:
+        admission_controller.exit()
+        current_fallbacks.reset(fallbacks_token)
+        current_degraded.reset(token)
+    # Responses served from the response cache carry an ETag and are not degraded
+    if (decision != ADMIT or fallbacks) and "etag" not in response.headers:
+        response.headers["X-ASCA-Degraded"] = "true"
+    return response
+
+
+@app.middleware("http")
+async def llm_context_middleware(request: Request, call_next):
+    """Tag agent LLM calls with the caller's priority class and tenant"""
+    priority = request.headers.get("X-ASCA-Priority", PRIORITY_INTERACTIVE).lower()
+    student = request.headers.get("X-Student-ID")
+    tenant = request.headers.get("X-Tenant-ID") or student
+    with llm_request_context(priority, tenant, student):
+        return await call_next(request)
+
+
+# Shared secret for admin endpoints and header-triggered profiling; both are off until it is set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+@app.middleware("http")
+async def profiling_middleware(request: Request, call_next):
+    """Capture a span timeline and CPU profile for opted-in or sampled requests"""
+    requested = bool(request.headers.get("X-ASCA-Profile")) and is_admin(request.headers.get("X-Admin-Token"))
+    if not request_profiler.should_profile(requested):
+        return await call_next(request)
+
+    with request_profiler.capture(request.method, request.url.path, request.headers.get("X-Student-ID")) as profile:
+        response = await call_next(request)
+    capture = profile.finish(response.status_code)
+    await asyncio.to_thread(request_profiler.save, capture)
+    response.headers["X-ASCA-Profile-ID"] = capture['profile_id']
+    return response
+
+
+# CORS middleware for frontend. Added after the middlewares above so it is the
+# outermost layer and their own responses (the admission 503) get CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # In production, specify your frontend URL
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-ASCA-Request-Hash", "X-ASCA-Degraded", "Retry-After"],
 )
 
+
+class WireJSONResponse(JSONResponse):
+    """
+    Serializes agent records straight to JSON in a single pass
+
+    Returning this from an endpoint skips FastAPI's jsonable_encoder walk, so
+    agent outputs are converted to the wire format exactly once.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if served_fallback() and isinstance(content, dict):
+            # Agent outputs came from local heuristics, not the LLM
+            content = {**content, "degraded": True}
+        with span("serialize"):
+            return json.dumps(content, default=wire_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
 # Initialize agents
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
@@ -39,6 +157,86 @@ assignment_analyzer = AssignmentAnalyzerAgent(GEMINI_API_KEY)
 schedule_optimizer = ScheduleOptimizerAgent(GEMINI_API_KEY)
 wellness_monitor = WellnessMonitorAgent(GEMINI_API_KEY)
 
+# Persistent history of agent outputs, keyed by the X-Student-ID header
+results = ResultStore(os.getenv("RESULT_STORE_PATH", "asca_results.db"))
+
+# Background runner for long multi-agent workflows
+jobs = JobManager(
+    max_concurrent=int(os.getenv("JOB_MAX_CONCURRENT", 4)),
+    max_pending=int(os.getenv("JOB_MAX_PENDING", 100)),
+    callback_hosts=os.getenv("JOB_CALLBACK_ALLOWED_HOSTS", "localhost,127.0.0.1").split(",")
+)
+
+
+def persist_results(
+    student_id: Optional[str],
+    workload_analysis: Dict[str, Any] = None,
+    schedule: Dict[str, Any] = None,
+    wellness_assessment: Dict[str, Any] = None,
+    analyses: List[Dict[str, Any]] = None
+):
+    """Queue agent outputs for background persistence (no-op without a student id)"""
+    if not student_id:
+        return
+    if workload_analysis is not None:
+        analyses = workload_analysis.get('individual_analyses', analyses)
+        summary = {k: v for k, v in workload_analysis.items() if k != 'individual_analyses'}
+        results.record(result_store.KIND_WORKLOAD_ANALYSIS, student_id, summary)
+    for analysis in analyses or []:
+        results.record(
+            result_store.KIND_ASSIGNMENT_ANALYSIS,
+            student_id,
+            analysis,
+            assignment_id=analysis.get('assignment_id')
+        )
+    if schedule is not None:
+        results.record(result_store.KIND_SCHEDULE, student_id, schedule)
+    if wellness_assessment is not None:
+        results.record(result_store.KIND_WELLNESS_ASSESSMENT, student_id, wellness_assessment)
+
+
+# Rendered responses for repeated identical requests (ETag / If-None-Match)
+response_cache = ResponseCache(
+    ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 900)),
+    max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", 500))
+)
+
+
+def cached_response(key: str, if_none_match: Optional[str]) -> Optional[Response]:
+    """304 or the stored body when an identical request was answered recently; None on a miss"""
+    entry, not_modified = response_cache.lookup(key, if_none_match)
+    if entry is None:
+        return None
+    headers = {"ETag": entry['etag'], "X-ASCA-Request-Hash": key}
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return Response(entry['body'], media_type="application/json", headers=headers)
+
+
+def cacheable_response(key: str, content: Dict[str, Any], if_none_match: Optional[str] = None) -> Response:
+    """Render a fresh result, store it under the request hash and tag it with an ETag"""
+    response = WireJSONResponse(content)
+    response.headers["X-ASCA-Request-Hash"] = key
+    if served_fallback():
+        # Degraded or fallback results are not cached, so clients never revalidate
+        # against them and the next identical request asks the LLM again
+        return response
+    etag = response_cache.put(key, response.body)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "X-ASCA-Request-Hash": key})
+    response.headers["ETag"] = etag
+    return response
+
+
+def parse_calendar(calendar_ics: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+    """Commitments from an uploaded iCalendar document (400 if it isn't one or is too large)"""
+    if not calendar_ics:
+        return None
+    try:
+        return parse_ics(calendar_ics)
+    except (ValueError, OverflowError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
 # Pydantic models for request/response
 class Assignment(BaseModel):
@@ -49,6 +247,18 @@ class Assignment(BaseModel):
     course: str
 
 
+class CatalogAssignment(BaseModel):
+    id: str
+    title: str
+    description: str
+    due_date: Optional[str] = None
+
+
+class CourseCatalogRequest(BaseModel):
+    course: str
+    assignments: List[CatalogAssignment]
+
+
 class StudentPreferences(BaseModel):
     daily_study_hours: Optional[int] = 6
     preferred_start_time: Optional[str] = "09:00"
@@ -63,10 +273,59 @@ class WellnessInput(BaseModel):
     energy_level: Optional[int] = 5
 
 
+class ScheduleChange(BaseModel):
+    type: str  # missed_session | completed_task | new_deadline | preferences_changed
+    date: Optional[str] = None
+    time: Optional[str] = None
+    assignment_id: Optional[str] = None
+    task: Optional[str] = None
+    due_date: Optional[str] = None
+    preferences: Optional[StudentPreferences] = None
+
+
+class RescheduleRequest(BaseModel):
+    daily_schedules: List[Dict[str, Any]]
+    change: ScheduleChange
+    preferences: Optional[StudentPreferences] = None
+    calendar_ics: Optional[str] = None  # fixed commitments moved sessions must avoid
+
+
 class MultiAgentRequest(BaseModel):
     assignments: List[Assignment]
     preferences: Optional[StudentPreferences] = None
     wellness_input: Optional[WellnessInput] = None
+    calendar_ics: Optional[str] = None  # fixed commitments to schedule around
+
+
+class ScheduleCheckRequest(BaseModel):
+    daily_schedules: List[Dict[str, Any]]
+    calendar_ics: Optional[str] = None
+
+
+class StudyGroupRegistration(BaseModel):
+    courses: List[str]
+    name: Optional[str] = None
+    daily_schedules: Optional[List[Dict[str, Any]]] = None  # default: latest stored schedule
+    calendar_ics: Optional[str] = None
+
+
+class CommonSlotRequest(BaseModel):
+    student_ids: List[str]
+    min_minutes: int = 60
+    dates: Optional[List[str]] = None
+
+
+class FreeSlotRequest(BaseModel):
+    daily_schedules: List[Dict[str, Any]]
+    calendar_ics: Optional[str] = None
+    dates: Optional[List[str]] = None
+    duration_minutes: int = 60
+    earliest: str = "08:00"
+    latest: str = "22:00"
+
+
+class FullAnalysisJobRequest(MultiAgentRequest):
+    callback_url: Optional[str] = None
 
 
 # API Endpoints
@@ -84,76 +343,330 @@ async def root():
     }
 
 
+@app.get("/api/llm/queue")
+async def llm_queue_status():
+    """LLM scheduler queue depth and queue-time metrics per priority class"""
+    return {
+        "success": True,
+        "data": {
+            **llm_scheduler.stats(),
+            "client": llm_client.stats()
+        }
+    }
+
+
+@app.get("/api/admission")
+async def admission_status():
+    """Admission control counters; degraded requests skip the LLM, rejected ones get a Retry-After"""
+    return {
+        "success": True,
+        "data": admission_controller.stats()
+    }
+
+
+@app.get("/api/llm/circuit-breakers")
+async def llm_circuit_breakers():
+    """Circuit breaker state per model; open breakers send agents straight to local fallbacks"""
+    return {
+        "success": True,
+        "data": llm_client.breaker_status()
+    }
+
+
+@app.get("/api/llm/models")
+async def llm_model_tiers():
+    """Model tier per task plus per-tier latency, validation pass rate and escalations"""
+    return {
+        "success": True,
+        "data": model_router.stats()
+    }
+
+
+@app.get("/api/llm/usage")
+async def llm_usage():
+    """Token usage per tenant (by agent and model) against its budget"""
+    return {
+        "success": True,
+        "data": llm_client.usage()
+    }
+
+
+@app.get("/api/llm/usage/tenants/{tenant}")
+async def llm_tenant_usage(tenant: str):
+    """Token usage and remaining budget for one tenant"""
+    usage = llm_client.ledger.tenant_summary(tenant)
+    if usage is None:
+        raise HTTPException(status_code=404, detail=f"No LLM usage recorded for tenant {tenant}")
+    return {
+        "success": True,
+        "data": usage
+    }
+
+
+@app.get("/api/llm/usage/students/{student_id}")
+async def llm_student_usage(student_id: str):
+    """Token usage attributed to one student (X-Student-ID)"""
+    usage = llm_client.ledger.student_summary(student_id)
+    if usage is None:
+        raise HTTPException(status_code=404, detail=f"No LLM usage recorded for student {student_id}")
+    return {
+        "success": True,
+        "data": usage
+    }
+
+
+@app.get("/api/admin/profiles")
+async def list_profiles(student_id: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    """Stored request profiles, newest first (optionally for one student)"""
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required (set ADMIN_TOKEN to enable admin endpoints)")
+    profiles = await asyncio.to_thread(request_profiler.list, student_id)
+    return {
+        "success": True,
+        "data": profiles
+    }
+
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    """Full capture: span timeline, per-phase totals and top CPU functions"""
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required (set ADMIN_TOKEN to enable admin endpoints)")
+    profile = await asyncio.to_thread(request_profiler.get, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return {
+        "success": True,
+        "data": profile
+    }
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the analysis cache and the quantized prompt memos"""
+    return {
+        "success": True,
+        "data": {
+            "similarity_cache": assignment_analyzer.similarity_cache.stats(),
+            "workload_recommendation_memo": assignment_analyzer.recommendation_memo.stats(),
+            "wellness_assessment_memo": wellness_monitor.assessment_memo.stats(),
+            "response_cache": response_cache.stats()
+        }
+    }
+
+
 @app.post("/api/analyze-assignment")
-async def analyze_single_assignment(assignment: Assignment):
+@profiled("handler.analyze_assignment")
+async def analyze_single_assignment(assignment: Assignment, x_student_id: Optional[str] = Header(None)):
     """
     Analyze a single assignment
     Agent: Assignment Analyzer
     """
     try:
         analysis = await assignment_analyzer.analyze_assignment(assignment.dict())
-        return {
+        persist_results(x_student_id, analyses=[analysis])
+        return WireJSONResponse({
             "success": True,
             "agent": assignment_analyzer.name,
             "data": analysis
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/catalog")
+async def register_course_catalog(request: CourseCatalogRequest):
+    """
+    Register a course's published assignments for background pre-analysis
+    Agent: Assignment Analyzer (bulk priority, off the request path)
+    """
+    try:
+        status = assignment_analyzer.register_course_catalog(
+            request.course,
+            [a.dict() for a in request.assignments]
+        )
+        return {
+            "success": True,
+            "agent": assignment_analyzer.name,
+            "data": status
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/catalog")
+async def course_catalog_overview():
+    """Pre-analysis progress and LLM budget usage across all courses"""
+    return {
+        "success": True,
+        "data": assignment_analyzer.catalog.status()
+    }
+
+
+@app.get("/api/catalog/{course}")
+async def course_catalog_status(course: str):
+    """Pre-analysis state of each registered assignment in a course"""
+    return {
+        "success": True,
+        "data": assignment_analyzer.catalog.status(course)
+    }
+
+
 @app.post("/api/analyze-workload")
-async def analyze_workload(assignments: List[Assignment]):
+@profiled("handler.analyze_workload")
+async def analyze_workload(
+    assignments: List[Assignment],
+    x_student_id: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
     """
     Analyze overall workload across multiple assignments
     Agent: Assignment Analyzer
     """
+    assignments_data = [a.dict() for a in assignments]
+    key = request_hash("analyze-workload", assignments=assignments_data, student=x_student_id)
+    cached = cached_response(key, if_none_match)
+    if cached is not None:
+        return cached
     try:
-        assignments_data = [a.dict() for a in assignments]
         analysis = await assignment_analyzer.analyze_workload(assignments_data)
-        return {
+        persist_results(x_student_id, workload_analysis=analysis)
+        return cacheable_response(key, {
             "success": True,
             "agent": assignment_analyzer.name,
             "data": analysis
-        }
+        }, if_none_match)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/create-schedule")
+@profiled("handler.create_schedule")
 async def create_schedule(
     assignments: List[Assignment],
-    preferences: Optional[StudentPreferences] = None
+    preferences: Optional[StudentPreferences] = None,
+    calendar_ics: Optional[str] = Body(None),
+    x_student_id: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Create optimized schedule
     Agent Flow: Assignment Analyzer → Schedule Optimizer
+    Sessions are kept clear of any events in `calendar_ics`
     """
+    commitments = parse_calendar(calendar_ics)
+    assignments_data = [a.dict() for a in assignments]
+    prefs_dict = preferences.dict() if preferences else None
+    key = request_hash(
+        "create-schedule",
+        assignments=assignments_data,
+        preferences=prefs_dict,
+        calendar_ics=calendar_ics,
+        student=x_student_id
+    )
+    cached = cached_response(key, if_none_match)
+    if cached is not None:
+        return cached
     try:
         # Step 1: Analyze workload
-        assignments_data = [a.dict() for a in assignments]
         workload_analysis = await assignment_analyzer.analyze_workload(assignments_data)
         
         # Step 2: Create schedule
-        prefs_dict = preferences.dict() if preferences else None
-        schedule = await schedule_optimizer.create_schedule(workload_analysis, prefs_dict)
+        schedule = await schedule_optimizer.create_schedule(workload_analysis, prefs_dict, commitments)
+        persist_results(x_student_id, workload_analysis=workload_analysis, schedule=schedule)
         
-        return {
+        return cacheable_response(key, {
             "success": True,
             "agents_involved": [assignment_analyzer.name, schedule_optimizer.name],
             "data": {
                 "workload_analysis": workload_analysis,
                 "schedule": schedule
             }
+        }, if_none_match)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/reschedule")
+@profiled("handler.reschedule")
+async def reschedule(request: RescheduleRequest):
+    """
+    Repair an existing schedule after a change event, without regenerating it
+    Agent: Schedule Optimizer (local, no LLM call)
+    """
+    commitments = parse_calendar(request.calendar_ics)
+    try:
+        # Only fields the client sent, so a partial update merges over the current preferences
+        prefs_dict = request.preferences.dict(exclude_unset=True) if request.preferences else None
+        change = request.change.dict()
+        if request.change.preferences is not None:
+            change['preferences'] = request.change.preferences.dict(exclude_unset=True)
+        repaired = await schedule_optimizer.repair_schedule(
+            request.daily_schedules,
+            change,
+            prefs_dict,
+            commitments
+        )
+        return {
+            "success": True,
+            "agent": schedule_optimizer.name,
+            "data": repaired
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/schedule/validate")
+async def validate_schedule(request: ScheduleCheckRequest):
+    """
+    Check a schedule for overlapping sessions and calendar conflicts
+    Agent: Schedule Optimizer (local, no LLM call)
+    """
+    commitments = parse_calendar(request.calendar_ics)
+    try:
+        issues = schedule_optimizer.check_schedule(request.daily_schedules, commitments)
+        return {
+            "success": True,
+            "data": {"valid": not issues, "issues": issues}
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/schedule/free-slots")
+async def schedule_free_slots(request: FreeSlotRequest):
+    """
+    Free blocks of at least `duration_minutes` between `earliest` and `latest`
+    Agent: Schedule Optimizer (local, no LLM call)
+    """
+    commitments = parse_calendar(request.calendar_ics)
+    try:
+        slots = schedule_optimizer.find_free_slots(
+            request.daily_schedules,
+            request.duration_minutes,
+            request.earliest,
+            request.latest,
+            dates=request.dates,
+            commitments=commitments
+        )
+        return {"success": True, "data": slots}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/wellness-check")
+@profiled("handler.wellness_check")
 async def wellness_check(
     assignments: List[Assignment],
     preferences: Optional[StudentPreferences] = None,
-    wellness_input: Optional[WellnessInput] = None
+    wellness_input: Optional[WellnessInput] = None,
+    x_student_id: Optional[str] = Header(None)
 ):
     """
     Perform wellness assessment
@@ -174,10 +687,12 @@ async def wellness_check(
         wellness_assessment = await wellness_monitor.assess_wellness(
             workload_analysis,
             schedule_data['data'],
-            wellness_dict
+            wellness_dict,
+            student_id=x_student_id
         )
+        persist_results(x_student_id, workload_analysis, schedule, wellness_assessment)
         
-        return {
+        return WireJSONResponse({
             "success": True,
             "agents_involved": [
                 assignment_analyzer.name,
@@ -189,74 +704,338 @@ async def wellness_check(
                 "schedule": schedule,
                 "wellness_assessment": wellness_assessment
             }
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def run_full_analysis(
+    request: MultiAgentRequest,
+    student_id: Optional[str] = None,
+    commitments: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Complete multi-agent workflow shared by the synchronous and job endpoints
+    Agent Flow: Assignment Analyzer → Schedule Optimizer → Wellness Monitor
+    """
+    # Step 1: Assignment Analyzer analyzes workload
+    assignments_data = [a.dict() for a in request.assignments]
+    workload_analysis = await assignment_analyzer.analyze_workload(assignments_data)
+
+    # Agent communication: Analyzer → Scheduler
+    analyzer_message = await assignment_analyzer.communicate_with_scheduler(workload_analysis)
+
+    # Step 2: Schedule Optimizer creates schedule
+    prefs_dict = request.preferences.dict() if request.preferences else None
+    schedule = await schedule_optimizer.create_schedule(workload_analysis, prefs_dict, commitments)
+
+    # Agent communication: Scheduler → Wellness
+    scheduler_message = await schedule_optimizer.communicate_with_wellness(schedule)
+
+    # Step 3: Wellness Monitor assesses wellness
+    wellness_dict = request.wellness_input.dict() if request.wellness_input else None
+    wellness_assessment = await wellness_monitor.assess_wellness(
+        workload_analysis,
+        scheduler_message['data'],
+        wellness_dict,
+        student_id=student_id
+    )
+
+    # Agent communication: Wellness → All
+    wellness_message = await wellness_monitor.communicate_with_agents(wellness_assessment)
+    persist_results(student_id, workload_analysis, schedule, wellness_assessment)
+
+    return {
+        "success": True,
+        "workflow": "Complete Multi-Agent Analysis",
+        "agents_involved": [
+            assignment_analyzer.name,
+            schedule_optimizer.name,
+            wellness_monitor.name
+        ],
+        "agent_communications": [
+            analyzer_message,
+            scheduler_message,
+            wellness_message
+        ],
+        "results": {
+            "workload_analysis": workload_analysis,
+            "schedule": schedule,
+            "wellness_assessment": wellness_assessment
+        },
+        "summary": {
+            "total_assignments": workload_analysis.get('total_assignments', 0),
+            "total_hours": workload_analysis.get('total_estimated_hours', 0),
+            "stress_level": workload_analysis.get('stress_level', 'Unknown'),
+            "wellness_score": wellness_assessment.get('wellness_score', 0),
+            "risk_level": wellness_assessment.get('risk_level', 'Unknown')
+        }
+    }
+
+
 @app.post("/api/full-analysis")
-async def full_multi_agent_analysis(request: MultiAgentRequest):
+@profiled("handler.full_analysis")
+async def full_multi_agent_analysis(
+    request: MultiAgentRequest,
+    x_student_id: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
     """
     Complete multi-agent workflow
     Agent Flow: Assignment Analyzer → Schedule Optimizer → Wellness Monitor
     Returns comprehensive analysis with all agent outputs
     """
+    commitments = parse_calendar(request.calendar_ics)
+    # The student's wellness trend feeds the assessment, so a new check-in changes the hash
+    key = request_hash(
+        "full-analysis",
+        request=request.dict(),
+        student=x_student_id,
+        trend=wellness_monitor.trends.get(x_student_id) if x_student_id else None
+    )
+    cached = cached_response(key, if_none_match)
+    if cached is not None:
+        return cached
     try:
-        # Step 1: Assignment Analyzer analyzes workload
-        assignments_data = [a.dict() for a in request.assignments]
-        workload_analysis = await assignment_analyzer.analyze_workload(assignments_data)
-        
-        # Agent communication: Analyzer → Scheduler
-        analyzer_message = await assignment_analyzer.communicate_with_scheduler(workload_analysis)
-        
-        # Step 2: Schedule Optimizer creates schedule
-        prefs_dict = request.preferences.dict() if request.preferences else None
-        schedule = await schedule_optimizer.create_schedule(workload_analysis, prefs_dict)
-        
-        # Agent communication: Scheduler → Wellness
-        scheduler_message = await schedule_optimizer.communicate_with_wellness(schedule)
-        
-        # Step 3: Wellness Monitor assesses wellness
-        wellness_dict = request.wellness_input.dict() if request.wellness_input else None
-        wellness_assessment = await wellness_monitor.assess_wellness(
-            workload_analysis,
-            scheduler_message['data'],
-            wellness_dict
+        result = await run_full_analysis(request, x_student_id, commitments)
+        return cacheable_response(key, result, if_none_match)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/jobs/full-analysis", status_code=202)
+async def submit_full_analysis_job(request: FullAnalysisJobRequest, x_student_id: Optional[str] = Header(None)):
+    """
+    Enqueue the complete multi-agent workflow and return a job id immediately
+    Poll GET /api/jobs/{job_id}, fetch GET /api/jobs/{job_id}/result
+    """
+    commitments = parse_calendar(request.calendar_ics)
+    try:
+        job = jobs.submit(
+            "full-analysis",
+            lambda: run_full_analysis(request, x_student_id, commitments),
+            callback_url=request.callback_url
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except JobQueueFullError as e:
+        retry_after = admission_controller.retry_after_seconds
+        return JSONResponse(
+            {"detail": f"Job queue is full ({e}), retry later", "retry_after": retry_after},
+            status_code=503,
+            headers={"Retry-After": str(retry_after)}
+        )
+    return {
+        "success": True,
+        "data": job,
+        "status_url": f"/api/jobs/{job['job_id']}",
+        "result_url": f"/api/jobs/{job['job_id']}/result"
+    }
+
+
+@app.get("/api/results/{key}")
+async def cached_result(key: str, if_none_match: Optional[str] = Header(None)):
+    """
+    Cached response for a request hash (X-ASCA-Request-Hash), without recomputation
+    404 once the entry has expired or been evicted
+    """
+    cached = cached_response(key, if_none_match)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="No cached result for this request hash")
+    return cached
+
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Status of a submitted job"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "success": True,
+        "data": jobs.view(job)
+    }
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    """Result of a finished job; 409 while it is still queued or running"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job['status'] in (JOB_QUEUED, JOB_RUNNING):
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    if job['status'] != JOB_SUCCEEDED:
+        raise HTTPException(status_code=410, detail=job['error'] or f"Job {job['status']}")
+    return WireJSONResponse(job['result'])
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not jobs.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+    return {
+        "success": True,
+        "data": jobs.view(job)
+    }
+
+
+@app.get("/api/study-groups")
+async def study_group_stats():
+    """Size of the study-group index"""
+    return {
+        "success": True,
+        "data": study_group_index.stats()
+    }
+
+
+@app.put("/api/study-groups/students/{student_id}")
+async def register_study_group_student(student_id: str, registration: StudyGroupRegistration):
+    """
+    Add or refresh a student's courses and availability for matching
+    Availability comes from the given schedule, or the student's latest stored one
+    """
+    commitments = parse_calendar(registration.calendar_ics)
+    daily_schedules = registration.daily_schedules
+    if daily_schedules is None:
+        stored = await asyncio.to_thread(results.latest, student_id, result_store.KIND_SCHEDULE)
+        if stored is None:
+            raise HTTPException(status_code=404, detail="No stored schedule for this student")
+        daily_schedules = stored['data'].get('daily_schedules', [])
+    try:
+        profile = study_group_index.register(
+            student_id,
+            registration.courses,
+            daily_schedules,
+            commitments,
+            name=registration.name
         )
-        
-        # Agent communication: Wellness → All
-        wellness_message = await wellness_monitor.communicate_with_agents(wellness_assessment)
-        
         return {
             "success": True,
-            "workflow": "Complete Multi-Agent Analysis",
-            "agents_involved": [
-                assignment_analyzer.name,
-                schedule_optimizer.name,
-                wellness_monitor.name
-            ],
-            "agent_communications": [
-                analyzer_message,
-                scheduler_message,
-                wellness_message
-            ],
-            "results": {
-                "workload_analysis": workload_analysis,
-                "schedule": schedule,
-                "wellness_assessment": wellness_assessment
-            },
-            "summary": {
-                "total_assignments": workload_analysis.get('total_assignments', 0),
-                "total_hours": workload_analysis.get('total_estimated_hours', 0),
-                "stress_level": workload_analysis.get('stress_level', 'Unknown'),
-                "wellness_score": wellness_assessment.get('wellness_score', 0),
-                "risk_level": wellness_assessment.get('risk_level', 'Unknown')
-            }
+            "data": profile
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.delete("/api/study-groups/students/{student_id}")
+async def remove_study_group_student(student_id: str):
+    """Stop matching a student"""
+    if not study_group_index.remove(student_id):
+        raise HTTPException(status_code=404, detail="Student is not registered for study groups")
+    return {"success": True}
+
+
+@app.get("/api/study-groups/students/{student_id}/partners")
+async def study_partners(
+    student_id: str,
+    k: int = 5,
+    course: Optional[str] = None,
+    min_overlap_minutes: int = 0
+):
+    """Top-k compatible partners by shared courses and overlapping free time"""
+    try:
+        partners = study_group_index.top_partners(student_id, k, course, min_overlap_minutes)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    return {
+        "success": True,
+        "data": partners
+    }
+
+
+@app.post("/api/study-groups/common-slots")
+async def study_group_common_slots(request: CommonSlotRequest):
+    """Blocks of at least `min_minutes` when every student in the group is free"""
+    try:
+        slots = study_group_index.common_free_slots(request.student_ids, request.min_minutes, request.dates)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    return {
+        "success": True,
+        "data": slots
+    }
+
+
+@app.post("/api/wellness-checkin")
+async def wellness_checkin(wellness_input: WellnessInput, x_student_id: str = Header(...)):
+    """
+    Record a wellness self-report and return rolling trends (no LLM call)
+    Agent: Wellness Monitor
+    """
+    try:
+        checkin = await wellness_monitor.record_checkin(x_student_id, wellness_input.dict())
+        return {
+            "success": True,
+            "agent": wellness_monitor.name,
+            "data": checkin
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/students/{student_id}/wellness-trends")
+async def wellness_trends(student_id: str):
+    """Current rolling wellness statistics for a student"""
+    trend = wellness_monitor.trends.get(student_id)
+    if trend is None:
+        raise HTTPException(status_code=404, detail="No wellness check-ins for this student")
+    return {
+        "success": True,
+        "data": trend
+    }
+
+
+@app.get("/api/students/{student_id}/latest")
+def latest_student_results(student_id: str):
+    """Latest stored workload, analyses, schedule and wellness assessment (no recomputation)"""
+    return {
+        "success": True,
+        "data": {
+            "workload_analysis": results.latest(student_id, result_store.KIND_WORKLOAD_ANALYSIS),
+            "individual_analyses": results.latest_analyses(student_id),
+            "schedule": results.latest(student_id, result_store.KIND_SCHEDULE),
+            "wellness_assessment": results.latest(student_id, result_store.KIND_WELLNESS_ASSESSMENT)
+        }
+    }
+
+
+@app.get("/api/students/{student_id}/assignments/{assignment_id}")
+def latest_assignment_analysis(student_id: str, assignment_id: str):
+    """Latest stored analysis of one assignment for a student"""
+    analyses = results.latest_analyses(student_id, assignment_id)
+    if not analyses:
+        raise HTTPException(status_code=404, detail="No stored analysis for this assignment")
+    return {
+        "success": True,
+        "data": analyses[0]
+    }
+
+
+@app.get("/api/students/{student_id}/wellness-history")
+def wellness_history(
+    student_id: str,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = 100
+):
+    """Stored wellness assessments in a time range (ISO dates/timestamps), oldest first"""
+    return {
+        "success": True,
+        "data": results.history(
+            student_id,
+            result_store.KIND_WELLNESS_ASSESSMENT,
+            since=since,
+            until=until,
+            limit=min(max(limit, 1), 1000)
+        )
+    }
+
+
 @app.post("/api/suggest-break")
 async def suggest_break(current_activity: str, time_worked: int):
     """
@@ -265,15 +1044,82 @@ async def suggest_break(current_activity: str, time_worked: int):
     """
     try:
         suggestion = await wellness_monitor.suggest_break(current_activity, time_worked)
-        return {
+        return WireJSONResponse({
             "success": True,
             "agent": wellness_monitor.name,
             "data": suggestion
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Sessions with no message for this long are closed to free the connection
+STUDY_SESSION_IDLE_SECONDS = float(os.getenv("STUDY_SESSION_IDLE_SECONDS", 900))
+
+
+@app.websocket("/ws/study-session")
+async def study_session_channel(websocket: WebSocket, student_id: Optional[str] = None):
+    """
+    Live break management over one long-lived connection
+    Agent: Wellness Monitor
+
+    Client messages:
+        {"type": "tick", "activity": "...", "elapsed_minutes": 42}
+        {"type": "break"}   student took a break, thresholds re-arm
+        {"type": "status"}
+        {"type": "end"}
+    A break_suggestion is pushed only when a threshold is crossed.
+    """
+    await websocket.accept()
+    session = wellness_monitor.start_study_session(student_id)
+    await websocket.send_json({
+        "type": "session_started",
+        "thresholds_minutes": list(session.thresholds),
+        **session.status()
+    })
+
+    try:
+        with llm_request_context(PRIORITY_INTERACTIVE, student_id, student_id):
+            while True:
+                try:
+                    message = await asyncio.wait_for(websocket.receive_json(), timeout=STUDY_SESSION_IDLE_SECONDS)
+                except asyncio.TimeoutError:
+                    await websocket.close(code=1000, reason="Idle timeout")
+                    return
+                except ValueError:
+                    await websocket.send_json({"type": "error", "detail": "Messages must be JSON"})
+                    continue
+
+                kind = message.get('type') if isinstance(message, dict) else None
+                if kind == "tick":
+                    try:
+                        elapsed = float(message.get('elapsed_minutes'))
+                    except (TypeError, ValueError):
+                        elapsed = None
+                    if elapsed is None or not math.isfinite(elapsed) or not 0 <= elapsed <= MAX_ELAPSED_MINUTES:
+                        await websocket.send_json({
+                            "type": "error",
+                            "detail": f"tick needs elapsed_minutes between 0 and {MAX_ELAPSED_MINUTES}"
+                        })
+                        continue
+                    result = await wellness_monitor.study_session_tick(session, message.get('activity'), elapsed)
+                    if result:
+                        await websocket.send_json({"type": "break_suggestion", "agent": wellness_monitor.name, **result})
+                elif kind == "break":
+                    session.take_break()
+                    await websocket.send_json({"type": "break_recorded", **session.status()})
+                elif kind == "status":
+                    await websocket.send_json({"type": "status", **session.status()})
+                elif kind == "end":
+                    await websocket.send_json({"type": "session_ended", **session.status()})
+                    await websocket.close()
+                    return
+                else:
+                    await websocket.send_json({"type": "error", "detail": f"Unknown message type: {kind}"})
+    except WebSocketDisconnect:
+        pass
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8080))
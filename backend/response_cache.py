@@ -0,0 +1,119 @@
+"""
+ASCA Response Cache
+Rendered agent responses keyed by a hash of the normalized request, with ETags
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+
+from agents.records import wire_default
+
+
+def request_hash(kind: str, **parts: Any) -> str:
+    """
+    Stable hash of an endpoint's inputs
+
+    Parts are serialized with sorted keys, so field order in the client's JSON
+    does not matter. Today's date is included because agent outputs (days
+    until due, schedule dates) are relative to it.
+    """
+    normalized = json.dumps(
+        {"kind": kind, "date": date.today().isoformat(), **parts},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=wire_default
+    )
+    return hashlib.sha256(normalized.encode()).hexdigest()[:32]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header lists the ETag (weak comparison, as for GET)
+
+    "*" never matches: the cached endpoints are POSTs that compute their result,
+    so only a client holding a real ETag may be answered with an empty 304.
+    """
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+class ResponseCache:
+    """
+    Response bodies keyed by request hash, kept for `ttl_seconds`
+
+    The ETag combines the request hash with a hash of the stored body, so a
+    recomputed result that differs (a new LLM answer after expiry) gets a new
+    ETag even though the inputs are the same. A TTL of 0 disables the cache.
+    """
+
+    def __init__(self, ttl_seconds: float = 900, max_entries: int = 500):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.not_modified = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    @staticmethod
+    def etag_for(key: str, body: bytes) -> str:
+        return f'"{key[:16]}-{hashlib.sha256(body).hexdigest()[:16]}"'
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Live entry ({"etag", "body", "stored_at"}) for a request hash, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry['stored_at'] > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def lookup(self, key: str, if_none_match: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Cached entry for a request, and whether the client's copy is current
+
+        Returns:
+            (entry or None, True when If-None-Match matches the entry's ETag)
+        """
+        entry = self.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+        if etag_matches(if_none_match, entry['etag']):
+            self.not_modified += 1
+            return entry, True
+        self.hits += 1
+        return entry, False
+
+    def put(self, key: str, body: bytes) -> str:
+        """Store a rendered body and return its ETag"""
+        etag = self.etag_for(key, body)
+        if not self.enabled:
+            return etag
+        self._entries[key] = {"etag": etag, "body": body, "stored_at": time.monotonic()}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return etag
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.not_modified + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "not_modified": self.not_modified,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.not_modified) / total, 3) if total else 0.0,
+            "ttl_seconds": self.ttl_seconds,
+        }
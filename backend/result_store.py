@@ -0,0 +1,210 @@
+"""
+ASCA Result Store
+SQLite-backed history of agent outputs per student, written off the request path
+"""
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from agents.records import wire_default
+
+
+KIND_ASSIGNMENT_ANALYSIS = "assignment_analysis"
+KIND_WORKLOAD_ANALYSIS = "workload_analysis"
+KIND_SCHEDULE = "schedule"
+KIND_WELLNESS_ASSESSMENT = "wellness_assessment"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    assignment_id TEXT,
+    created_at TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_student_kind_time
+    ON results (student_id, kind, created_at);
+CREATE INDEX IF NOT EXISTS idx_results_student_assignment_time
+    ON results (student_id, assignment_id, created_at);
+"""
+
+
+class ResultStore:
+    """
+    Persists agent outputs and serves the latest/historical results
+
+    `record` only enqueues; a single writer thread batches rows into SQLite so
+    persistence adds no latency to API responses. Reads use per-thread
+    connections against the WAL-mode database.
+    """
+
+    def __init__(self, path: str = "asca_results.db", batch_size: int = 200):
+        self.path = path
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._local = threading.local()
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        conn.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name="result-store-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def record(
+        self,
+        kind: str,
+        student_id: str,
+        payload: Dict[str, Any],
+        assignment_id: str = None
+    ):
+        """
+        Queue a result for persistence (non-blocking)
+
+        Args:
+            kind: One of the KIND_* constants
+            student_id: Student the result belongs to
+            payload: Agent output (dicts and/or agent records)
+            assignment_id: Assignment the result refers to, if any
+        """
+        created_at = datetime.now().isoformat()
+        self._queue.put((kind, student_id, assignment_id, created_at, payload))
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # Drain whatever else is waiting into the same transaction
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                rows = [(*row[:4], json.dumps(row[4], default=wire_default)) for row in batch]
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO results (kind, student_id, assignment_id, created_at, payload) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        rows
+                    )
+            except Exception as e:
+                # Never let one bad batch kill the writer; flush() would wait forever
+                print(f"Error persisting results: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """
+        Block until every queued result has been written
+
+        Returns:
+            False if the timeout passed or the writer thread died first
+        """
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._writer.is_alive():
+                    return False
+                self._queue.all_tasks_done.wait(min(remaining, 0.5))
+        return True
+
+    @staticmethod
+    def _decode(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "kind": row["kind"],
+            "assignment_id": row["assignment_id"],
+            "created_at": row["created_at"],
+            "data": json.loads(row["payload"]),
+        }
+
+    def latest(self, student_id: str, kind: str) -> Optional[Dict[str, Any]]:
+        """Most recent result of one kind for a student, or None"""
+        row = self._reader().execute(
+            "SELECT * FROM results WHERE student_id = ? AND kind = ? "
+            "ORDER BY created_at DESC, id DESC LIMIT 1",
+            (student_id, kind)
+        ).fetchone()
+        return self._decode(row) if row else None
+
+    def latest_analyses(self, student_id: str, assignment_id: str = None) -> List[Dict[str, Any]]:
+        """
+        Latest assignment analysis per assignment for a student
+
+        Args:
+            student_id: Student to look up
+            assignment_id: Restrict to one assignment
+
+        Returns:
+            One stored analysis per assignment, newest first
+        """
+        sql = (
+            "SELECT r.* FROM results r JOIN ("
+            "  SELECT assignment_id, MAX(id) AS id FROM results"
+            "  WHERE student_id = ? AND kind = ?{filter} GROUP BY assignment_id"
+            ") latest ON r.id = latest.id ORDER BY r.created_at DESC"
+        )
+        params = [student_id, KIND_ASSIGNMENT_ANALYSIS]
+        if assignment_id is not None:
+            sql = sql.format(filter=" AND assignment_id = ?")
+            params.append(assignment_id)
+        else:
+            sql = sql.format(filter="")
+        rows = self._reader().execute(sql, params).fetchall()
+        return [self._decode(row) for row in rows]
+
+    def history(
+        self,
+        student_id: str,
+        kind: str,
+        since: str = None,
+        until: str = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Results of one kind for a student within a time range, oldest first
+
+        Args:
+            student_id: Student to look up
+            kind: One of the KIND_* constants
+            since: Inclusive ISO timestamp/date lower bound
+            until: Inclusive ISO timestamp/date upper bound
+            limit: Maximum rows returned (most recent ones)
+
+        Returns:
+            List of stored results
+        """
+        sql = "SELECT * FROM results WHERE student_id = ? AND kind = ?"
+        params: List[Any] = [student_id, kind]
+        if since:
+            sql += " AND created_at >= ?"
+            params.append(since)
+        if until:
+            # A bare date covers that whole day
+            sql += " AND created_at <= ?"
+            params.append(until if "T" in until else f"{until}T23:59:59.999999")
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        rows = self._reader().execute(sql, params).fetchall()
+        return [self._decode(row) for row in reversed(rows)]
@@ -1,6 +1,9 @@
 """
 Test script for ASCA Multi-Agent System
 Demonstrates agent communication and workflow
+
+Set LLM_MODE=record to capture Gemini responses into LLM_RECORDINGS_PATH,
+then LLM_MODE=replay to rerun offline and deterministically.
 """
 
 import asyncio
@@ -8,6 +11,7 @@ import json
 from agents.assignment_analyzer import AssignmentAnalyzerAgent
 from agents.schedule_optimizer import ScheduleOptimizerAgent
 from agents.wellness_monitor import WellnessMonitorAgent
+from agents.records import wire_default
 
 # Your Gemini API Key - set via environment variable
 import os
@@ -182,7 +186,7 @@ async def test_multi_agent_workflow():
     }
     
     with open('test_results.json', 'w') as f:
-        json.dump(results, f, indent=2)
+        json.dump(results, f, indent=2, default=wire_default)
     
     print("💾 Results saved to test_results.json")
     print()